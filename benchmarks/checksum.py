@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Compares the rate of checksumming local files: whole-file reads in one thread,
+`ingest.checksum_file()` in one thread, and `ingest.checksum_file()` in a process pool.
+
+Run it on the file system the ingest reads from; drop the page cache between runs
+to measure the disk instead of memory.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+# run from a checkout without installing the package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from wipac_fc import ingest
+
+
+def read_whole(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha512(f.read()).hexdigest(), os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('paths', nargs='*', help='files to hash; temporary files are written if none are given')
+    parser.add_argument('--files', type=int, default=8, help='number of temporary files')
+    parser.add_argument('--size', type=int, default=256, help='size of the temporary files in MB')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help='size of the process pool')
+    args = parser.parse_args()
+
+    tmpdir = None
+    paths = args.paths
+
+    if not paths:
+        tmpdir = tempfile.mkdtemp()
+        block = os.urandom(1024 * 1024)
+        for i in range(args.files):
+            path = os.path.join(tmpdir, 'file%d' % i)
+            with open(path, 'wb') as f:
+                for _ in range(args.size):
+                    f.write(block)
+            paths.append(path)
+
+    total = sum(os.path.getsize(p) for p in paths)
+
+    try:
+        with ProcessPoolExecutor(args.processes) as pool:
+            for name, run in [('whole-file reads', lambda: [read_whole(p) for p in paths]),
+                              ('checksum_file', lambda: [ingest.checksum_file(p) for p in paths]),
+                              ('checksum_file x %d' % args.processes, lambda: list(pool.map(ingest.checksum_file, paths)))]:
+                start = time.time()
+                run()
+                elapsed = time.time() - start
+                print('{:<24} {:>8.2f} s {:>10.1f} MB/s'.format(name, elapsed, total / elapsed / 1024.0 ** 2))
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
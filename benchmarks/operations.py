@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Measures the throughput and request latency of the client operations against the
+in-process stand-in server of `wipac_fc.testing`, at varying concurrency.
+
+The server adds `--latency` seconds to every request to model the network round
+trip and the database; with `--throttle` a fraction of the requests gets a 429.
+Since the server runs in the same process, it competes with the client for the
+interpreter; compare results of one machine and setting only.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+# run from a checkout without installing the package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from wipac_fc.client import WFCClient
+from wipac_fc.metrics import Metrics
+from wipac_fc.ratelimit import RateController
+from wipac_fc.testing import FakeServer
+
+
+def make_file(i, prefix='file'):
+    return {
+        'uuid': '%08x-0000-4000-8000-%012x' % (i, i),
+        'logical_name': '/data/exp/IceCube/2017/filtered/level2/Run%08d_%s%d.i3.zst' % (i // 100, prefix, i),
+        'file_size': 100000000 + i,
+        'checksum': {'sha512': '%0128x' % i},
+        'locations': [{'site': 'WIPAC', 'path': '/data/exp/IceCube/2017/Run%08d_%d.i3.zst' % (i // 100, i)}],
+        'content_status': 'good',
+        'offline_processing_metadata': {'dataset_id': 1883, 'run_id': i // 100, 'subrun': i % 100},
+    }
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100.0 * len(values)))]
+
+
+class Latencies(object):
+    """
+    Collects the latency of every request via a post hook of `Metrics`.
+    """
+
+    def __init__(self, metrics):
+        self.values = []
+        self._lock = threading.Lock()
+        metrics.add_post_hook(self)
+
+    def __call__(self, method, url, r, elapsed):
+        with self._lock:
+            self.values.append(elapsed)
+
+    def reset(self):
+        with self._lock:
+            self.values = []
+
+
+def concurrently(fn, items, max_workers):
+    """
+    Calls `fn` for each of `items` with `max_workers` threads and counts the truthy results.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sum(1 for result in executor.map(fn, items) if result)
+
+
+def scenarios(client, server, args):
+    """
+    Yields `(name, concurrency, run)`, where `run()` performs the operation and
+    returns the number of files it handled.
+    """
+    uids = list(server.catalog.files)[:args.ops]
+
+    for prefetch in (0, 1, 3):
+        yield 'iter_list', prefetch + 1, lambda prefetch=prefetch: sum(
+            1 for _ in client.iter_list(page_size=args.page_size, prefetch=prefetch))
+
+    for n in args.concurrency:
+        yield 'iter_list_sharded', n, lambda n=n: sum(
+            1 for _ in client.iter_list_sharded(page_size=args.page_size, max_workers=n))
+
+    yield 'get', 1, lambda: sum(1 for uid in uids if client.get(uid))
+
+    for n in args.concurrency:
+        yield 'get_many', n, lambda n=n: sum(1 for _ in client.get_many(uids, max_workers=n))
+
+    def new_files(run):
+        for i in range(args.ops):
+            f = make_file(i, 'new%d_' % run)
+            del f['uuid']
+            yield f
+
+    for run_number, n in enumerate(args.concurrency):
+        def run(run_number=run_number, n=n):
+            return sum(1 for _ in client.create_many(new_files(run_number), max_workers=n))
+
+        yield 'create_many', n, run
+
+    for etag in (None, False):
+        name = 'update' if etag is None else 'update (etag=False)'
+
+        def update(uid, etag=etag):
+            return client.update(uid, {'content_status': 'good'}, etag=etag)
+
+        for n in args.concurrency:
+            yield name, n, lambda update=update, n=n: concurrently(update, uids, n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=20000, help='files in the catalog')
+    parser.add_argument('--ops', type=int, default=500, help='files per get, create and update run')
+    parser.add_argument('--page-size', type=int, default=1000, help='page size of listings')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help='worker counts')
+    parser.add_argument('--latency', type=float, default=0.002, help='server latency in seconds')
+    parser.add_argument('--throttle', type=float, default=0.0, help='fraction of requests answered with 429')
+    args = parser.parse_args()
+
+    metrics = Metrics()
+    latencies = Latencies(metrics)
+
+    with FakeServer(latency=args.latency, throttle=args.throttle) as server:
+        for i in range(args.files):
+            server.catalog.add(make_file(i))
+
+        rate_controller = RateController(max_concurrency=max(args.concurrency)) if args.throttle else None
+        client = WFCClient(server.url, server.port, pool_maxsize=max(args.concurrency),
+                           metrics=metrics, rate_controller=rate_controller)
+
+        print('{:<20} {:>4} {:>8} {:>8} {:>10} {:>9} {:>9} {:>9}'.format(
+            'operation', 'n', 'files', 'seconds', 'files/s', 'p50 ms', 'p95 ms', 'p99 ms'))
+
+        for name, concurrency, run in scenarios(client, server, args):
+            latencies.reset()
+            start = time.time()
+            count = run()
+            elapsed = time.time() - start
+
+            values = latencies.values
+            print('{:<20} {:>4} {:>8} {:>8.2f} {:>10.0f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+                name, concurrency, count, elapsed, count / elapsed,
+                1000 * percentile(values, 50), 1000 * percentile(values, 95), 1000 * percentile(values, 99)))
+
+        if rate_controller is not None:
+            print('rate controller: {}'.format(rate_controller.stats()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Compares the memory used by file metadata decoded as dicts and as `FileRecord`s.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# run from a checkout without installing the package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from wipac_fc.record import FileRecord
+
+
+def make_file(i):
+    return {
+        'uuid': '%08x-0000-4000-8000-%012x' % (i, i),
+        'logical_name': '/data/exp/IceCube/2017/filtered/level2/Run%08d_%d.i3.zst' % (i // 100, i),
+        'file_size': 100000000 + i,
+        'checksum': {'sha512': '%0128x' % i},
+        'locations': [{'site': 'WIPAC', 'path': '/data/exp/IceCube/2017/Run%08d_%d.i3.zst' % (i // 100, i)}],
+        'content_status': 'good',
+        'data_type': 'real',
+        'create_date': '2017-05-01T12:00:00',
+        'meta_modify_date': '2017-05-02T12:00:00',
+        'processing_level': 'L2',
+        'offline_processing_metadata': {
+            'dataset_id': 1883, 'run_id': i // 100, 'season': 2017, 'subrun': i % 100,
+            'first_event': 1000 * i, 'last_event': 1000 * i + 999, 'livetime': 21.3, 'GRL': True,
+            'L2_gcd_file': '/data/exp/IceCube/2017/filtered/level2/Run%08d_GCD.i3.zst' % (i // 100),
+        },
+    }
+
+
+def measure(decode, raws):
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    objs = [decode(raw) for raw in raws]
+    elapsed = time.time() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=100000, help='number of files')
+    args = parser.parse_args()
+
+    raws = [json.dumps(make_file(i)).encode('utf-8') for i in range(args.files)]
+
+    for name, decode in [('dict', json.loads),
+                         ('FileRecord', FileRecord.from_json),
+                         ('FileRecord (dict)', lambda raw: FileRecord.from_dict(json.loads(raw)))]:
+        size, elapsed = measure(decode, raws)
+        print('{:<20} {:>8.1f} MB {:>8.0f} bytes/file {:>8.2f} s'.format(
+            name, size / 1024.0 ** 2, float(size) / args.files, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,10 +18,8 @@ def main():
     for parm in ['dataset_id', 'season', 'run_id']:
         if getattr(args, parm):
             query['.'.join(['offline_processing_metadata', parm])] = getattr(args, parm)
-    files = client.get_list(query=query)['_embedded']['files']
-    uuids = [f['uuid'] for f in files]
-    for uuid in uuids:
-        metadata = client.get(uuid)
+    files = client.iter_list(query=query, keys=['uuid', 'content_status', 'locations'])
+    for metadata in files:
         if metadata['content_status'] == 'good':
             path = [l['path'] for l in metadata['locations'] if l['site'] == 'Madison']
             if len(path) > 0:
@@ -18,8 +18,6 @@ def main():
 
     client = WFCClient('http://128.104.5.129', 31135)
 
-    total_size = 0
-
     query = {'data_type': args.data_type}
     if args.begin_date or args.end_date:
         query['create_date'] = {}
@@ -31,13 +29,10 @@ def main():
     if args.logical_name:
         query['logical_name'] = {'$regex': args.logical_name}
 
-    files = client.get_list(query=query)['_embedded']['files']
-    uuids = [f['uuid'] for f in files]
-    for uuid in uuids:
-        metadata = client.get(uuid)
-        total_size += metadata['file_size']
+    columns = client.get_columns({'file_size': 'int'}, query=query)
+    total_size = columns.sum('file_size')
 
-    print 'Total Files: {} Total Size: {}GBs'.format(len(uuids), total_size/(1024.0**3))
+    print('Total Files: {} Total Size: {}GBs'.format(len(columns), total_size / (1024.0 ** 3)))
 
 
 if __name__ == '__main__':
@@ -16,7 +16,11 @@ setup(
         'Programming Language :: Python :: 3.5',
     ],
     packages=find_packages(),
-    install_requires=['requests'],
+    install_requires=['requests', 'futures; python_version < "3"'],
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+    },
     package_data={
         'wipac_fc': []
     },
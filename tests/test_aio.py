@@ -0,0 +1,102 @@
+import asyncio
+import json
+import sys
+import unittest
+
+try:
+    from aiohttp import web
+    from wipac_fc.aio import AsyncWFCClient
+except ImportError:
+    web = None
+
+from wipac_fc.client import ConflictError, NotFoundError
+
+
+def make_app(files):
+    """
+    A minimal stand-in for the file catalog api.
+    """
+    async def list_files(request):
+        start = int(request.query.get('start', 0))
+        limit = int(request.query.get('limit', 10000))
+        uids = sorted(files)[start:start + limit]
+        return web.json_response({'_embedded': {'files': [{'uuid': u} for u in uids]},
+                                  'files': ['/api/files/' + u for u in uids]})
+
+    async def create(request):
+        metadata = json.loads(await request.text())
+        if metadata['uuid'] in files:
+            return web.json_response({'message': 'conflict with existing file'}, status=409)
+
+        files[metadata['uuid']] = metadata
+        return web.json_response({'file': '/api/files/' + metadata['uuid']}, status=201)
+
+    async def get(request):
+        uid = request.match_info['uid']
+        if uid not in files:
+            return web.json_response({'message': 'not found'}, status=404)
+
+        return web.json_response(files[uid], headers={'ETag': 'etag-' + uid})
+
+    async def patch(request):
+        uid = request.match_info['uid']
+        if request.headers.get('If-None-Match') != 'etag-' + uid:
+            return web.json_response({'message': 'etag mismatch'}, status=412)
+
+        files[uid].update(json.loads(await request.text()))
+        return web.json_response(files[uid])
+
+    async def delete(request):
+        files.pop(request.match_info['uid'], None)
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_get('/api/files', list_files)
+    app.router.add_post('/api/files', create)
+    app.router.add_get('/api/files/{uid}', get)
+    app.router.add_patch('/api/files/{uid}', patch)
+    app.router.add_delete('/api/files/{uid}', delete)
+    return app
+
+
+@unittest.skipIf(web is None or sys.version_info < (3, 8), 'requires aiohttp')
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.files = {}
+        self.runner = web.AppRunner(make_app(self.files))
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.client = AsyncWFCClient('http://127.0.0.1', port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_roundtrip(self):
+        await self.client.create({'uuid': 'a', 'file_size': 1})
+        self.assertEqual((await self.client.get('a'))['file_size'], 1)
+
+        await self.client.update('a', {'file_size': 2})
+        self.assertEqual((await self.client.get('a'))['file_size'], 2)
+
+        await self.client.delete('a')
+        with self.assertRaises(NotFoundError):
+            await self.client.get('a')
+
+    async def test_errors(self):
+        await self.client.create({'uuid': 'a'})
+        with self.assertRaises(ConflictError) as cm:
+            await self.client.create({'uuid': 'a'})
+
+        self.assertEqual(cm.exception.message, 'conflict with existing file')
+
+    async def test_concurrent_requests(self):
+        await asyncio.gather(*[self.client.create({'uuid': '%03d' % i}) for i in range(200)])
+        results = await asyncio.gather(*[self.client.get('%03d' % i) for i in range(200)])
+
+        self.assertEqual([r['uuid'] for r in results], ['%03d' % i for i in range(200)])
+
+        r = await self.client.get_list(start=10, limit=5)
+        self.assertEqual([f['uuid'] for f in r['_embedded']['files']], ['%03d' % i for i in range(10, 15)])
@@ -0,0 +1,125 @@
+import threading
+import time
+import unittest
+
+from wipac_fc.buffered import BufferedUpdater
+from wipac_fc.client import ClientError, NotFoundError, WFCClient
+from wipac_fc.testing import FakeServer
+
+
+class TestBufferedUpdater(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer().start()
+        self.addCleanup(self.server.stop)
+
+        self.catalog = self.server.catalog
+        for i in range(3):
+            self.catalog.add({'uuid': 'uid-%d' % i, 'logical_name': '/data/%d.i3' % i, 'a': 0})
+
+        self.client = WFCClient(self.server.url, self.server.port)
+
+    def test_merges_patches_per_file(self):
+        with BufferedUpdater(self.client, max_delay=60) as updater:
+            for i in range(10):
+                updater.update('uid-0', {'a': i, 'b%d' % (i % 2): i})
+                updater.update('uid-1', {'a': -i})
+
+            self.assertEqual(len(updater), 2)
+            updater.flush()
+            self.assertEqual(len(updater), 0)
+
+        self.assertEqual(self.catalog.files['uid-0']['a'], 9)
+        self.assertEqual((self.catalog.files['uid-0']['b0'], self.catalog.files['uid-0']['b1']), (8, 9))
+        self.assertEqual(self.catalog.files['uid-1']['a'], -9)
+        self.assertEqual(self.catalog.requests['PATCH'], 2)
+        self.assertEqual(updater.sent, 2)
+
+    def test_size_threshold(self):
+        updater = BufferedUpdater(self.client, max_pending=2, max_delay=60)
+        updater.update('uid-0', {'a': 1})
+        updater.update('uid-1', {'a': 1})
+
+        deadline = time.time() + 5
+        while updater.sent < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(updater.sent, 2)
+        updater.close()
+
+    def test_time_threshold(self):
+        updater = BufferedUpdater(self.client, max_delay=0.05)
+        updater.update('uid-2', {'a': 5})
+
+        time.sleep(0.5)
+        self.assertEqual(self.catalog.files['uid-2']['a'], 5)
+        updater.close()
+
+    def test_errors_per_file(self):
+        failures = []
+
+        with BufferedUpdater(self.client, etag=False,
+                             on_error=lambda uid, metadata, error: failures.append((uid, metadata))) as updater:
+            updater.update('uid-0', {'a': 1})
+            updater.update('missing', {'a': 1})
+
+        self.assertEqual(list(updater.errors), ['missing'])
+        self.assertIsInstance(updater.errors['missing'], NotFoundError)
+        self.assertEqual(failures, [('missing', {'a': 1})])
+        self.assertEqual(self.catalog.files['uid-0']['a'], 1)
+
+        # no etags were requested
+        self.assertNotIn('GET', self.catalog.requests)
+
+    def test_error_cleared(self):
+        with BufferedUpdater(self.client, etag=False) as updater:
+            updater.update('uid-9', {'a': 1})
+            updater.flush()
+            self.assertIn('uid-9', updater.errors)
+
+            self.catalog.add({'uuid': 'uid-9', 'logical_name': '/data/9.i3'})
+            updater.update('uid-9', {'a': 2})
+
+        self.assertEqual(updater.errors, {})
+
+    def test_backpressure(self):
+        release = threading.Event()
+        update = self.client.update
+
+        def slow_update(*args, **kwargs):
+            release.wait(5)
+            return update(*args, **kwargs)
+
+        self.client.update = slow_update
+        updater = BufferedUpdater(self.client, max_pending=2, max_delay=60)
+
+        # the first two are being sent while the next four fill the buffer
+        updater.update('uid-0', {'a': 1})
+        updater.update('uid-1', {'a': 1})
+        while len(updater):
+            time.sleep(0.01)
+
+        for uid in ('uid-2', 'x', 'y', 'z'):
+            updater.update(uid, {'a': 1})
+
+        blocked = threading.Thread(target=updater.update, args=('w', {'a': 1}))
+        blocked.start()
+        blocked.join(0.2)
+        self.assertTrue(blocked.is_alive())
+
+        # patches of waiting files are merged without blocking
+        updater.update('x', {'b': 1})
+        self.assertEqual(len(updater), 4)
+
+        release.set()
+        blocked.join(5)
+        self.assertFalse(blocked.is_alive())
+        updater.close()
+
+        self.assertEqual(sorted(updater.errors), ['w', 'x', 'y', 'z'])
+
+    def test_closed(self):
+        updater = BufferedUpdater(self.client)
+        updater.close()
+
+        with self.assertRaises(ClientError):
+            updater.update('uid-0', {'a': 1})
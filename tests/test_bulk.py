@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+
+from wipac_fc.client import NotFoundError, WFCClient
+
+
+class FakeGetClient(WFCClient):
+    """
+    Serves `get()` from an in-memory dict and records the peak concurrency.
+    """
+
+    def __init__(self, files, delay=0.0):
+        super(FakeGetClient, self).__init__('http://localhost', 8888)
+        self.files = files
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get(self, uid):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+        try:
+            time.sleep(self.delay)
+            if uid not in self.files:
+                raise NotFoundError('not found')
+
+            return self.files[uid]
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestGetMany(unittest.TestCase):
+    def setUp(self):
+        self.files = dict((str(i), {'uuid': str(i), 'file_size': i}) for i in range(50))
+
+    def test_ordered(self):
+        client = FakeGetClient(self.files)
+        uids = [str(i) for i in range(50)]
+        results = list(client.get_many(uids, max_workers=4))
+
+        self.assertEqual([r[0] for r in results], uids)
+        self.assertEqual([r[1]['file_size'] for r in results], list(range(50)))
+        self.assertTrue(all(r[2] is None for r in results))
+
+    def test_unordered(self):
+        client = FakeGetClient(self.files)
+        results = list(client.get_many((str(i) for i in range(50)), max_workers=4, ordered=False))
+
+        self.assertEqual(sorted(int(r[0]) for r in results), list(range(50)))
+
+    def test_errors_are_returned(self):
+        client = FakeGetClient(self.files)
+        results = list(client.get_many(['1', 'missing', '2']))
+
+        self.assertEqual([r[0] for r in results], ['1', 'missing', '2'])
+        self.assertIsNone(results[1][1])
+        self.assertIsInstance(results[1][2], NotFoundError)
+        self.assertEqual(results[2][1]['file_size'], 2)
+
+    def test_bounded_concurrency(self):
+        client = FakeGetClient(self.files, delay=0.01)
+        list(client.get_many([str(i) for i in range(50)], max_workers=3))
+
+        self.assertLessEqual(client.peak, 3)
+        self.assertGreater(client.peak, 1)
@@ -0,0 +1,85 @@
+import time
+import unittest
+
+from wipac_fc.cache import LRUDict, MetadataCache
+from wipac_fc.client import NotFoundError, WFCClient
+
+from . import FakeResponse, RecordingTransport
+
+
+class TestLRUDict(unittest.TestCase):
+    def test_eviction(self):
+        d = LRUDict(2)
+        d['a'] = 1
+        d['b'] = 2
+        d.get('a')
+        d['c'] = 3
+
+        self.assertIn('a', d)
+        self.assertNotIn('b', d)
+        self.assertEqual(len(d), 2)
+
+
+class TestMetadataCache(unittest.TestCase):
+    def client(self, cache, *responses):
+        self.transport = RecordingTransport(*responses)
+        return WFCClient('http://localhost', transport=self.transport, cache=cache)
+
+    def test_hit(self):
+        cache = MetadataCache()
+        client = self.client(cache, FakeResponse(200, {'uuid': 'a', 'file_size': 1}, {'etag': 'e'}))
+
+        first = client.get('a')
+        first['file_size'] = 42
+        self.assertEqual(client.get('a')['file_size'], 1)
+
+        self.assertEqual(len(self.transport.requests), 1)
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 1,
+                                         'revalidations': 0, 'not_modified': 0})
+
+    def test_revalidation(self):
+        cache = MetadataCache(ttl=0)
+        client = self.client(cache,
+                             FakeResponse(200, {'uuid': 'a', 'file_size': 1}, {'etag': 'e1'}),
+                             FakeResponse(304),
+                             FakeResponse(200, {'uuid': 'a', 'file_size': 2}, {'etag': 'e2'}))
+
+        client.get('a')
+        self.assertEqual(client.get('a')['file_size'], 1)
+        self.assertEqual(client.get('a')['file_size'], 2)
+
+        self.assertEqual(self.transport.requests[1][2]['headers'], {'If-None-Match': 'e1'})
+        self.assertEqual(self.transport.requests[2][2]['headers'], {'If-None-Match': 'e1'})
+        self.assertEqual(cache.revalidations, 2)
+        self.assertEqual(cache.not_modified, 1)
+
+    def test_expiry_without_etag(self):
+        cache = MetadataCache(ttl=0.01)
+        client = self.client(cache, FakeResponse(200, {'uuid': 'a'}), FakeResponse(200, {'uuid': 'a'}))
+
+        client.get('a')
+        time.sleep(0.02)
+        client.get('a')
+
+        self.assertNotIn('headers', self.transport.requests[1][2])
+        self.assertEqual(cache.misses, 2)
+
+    def test_invalidation(self):
+        cache = MetadataCache()
+        client = self.client(cache,
+                             FakeResponse(200, {'uuid': 'a'}, {'etag': 'e'}),
+                             FakeResponse(200, {}),
+                             FakeResponse(200, {'uuid': 'a'}, {'etag': 'e'}),
+                             FakeResponse(204),
+                             FakeResponse(404, {'message': 'not found'}))
+
+        client.get('a')
+        client.update('a', {'x': 1})
+        client.get('a')
+        client.delete('a')
+
+        with self.assertRaises(NotFoundError):
+            client.get('a')
+
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(len(self.transport.requests), 5)
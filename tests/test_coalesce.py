@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+
+from wipac_fc.client import NotFoundError, WFCClient
+from wipac_fc.coalesce import SingleFlight
+
+from . import FakeResponse, RecordingTransport
+
+
+class BlockingTransport(RecordingTransport):
+    """
+    Holds every request until `release` is set.
+    """
+
+    def __init__(self, *responses):
+        super(BlockingTransport, self).__init__(*responses)
+        self.release = threading.Event()
+
+    def request(self, method, url, **kwargs):
+        self.release.wait()
+        return super(BlockingTransport, self).request(method, url, **kwargs)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.001)
+
+
+class TestCoalescing(unittest.TestCase):
+    def run_concurrently(self, client, call, n=4):
+        results = [None] * n
+        errors = [None] * n
+
+        def run(i):
+            try:
+                results[i] = call()
+            except Exception as e:
+                errors[i] = e
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+        for t in threads:
+            t.start()
+
+        wait_for(lambda: client._flight.stats()['shared'] == n - 1)
+        client._transport.release.set()
+
+        for t in threads:
+            t.join()
+
+        return results, errors
+
+    def test_get(self):
+        transport = BlockingTransport(FakeResponse(200, {'uuid': 'a', 'locations': []}))
+        client = WFCClient('http://localhost', transport=transport, coalesce=True)
+
+        results, errors = self.run_concurrently(client, lambda: client.get('a'))
+
+        self.assertEqual(len(transport.requests), 1)
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual(results, [{'uuid': 'a', 'locations': []}] * 4)
+
+        # every caller has its own copy
+        self.assertEqual(len(set(id(r['locations']) for r in results)), 4)
+
+    def test_errors_reach_every_caller(self):
+        transport = BlockingTransport(FakeResponse(404, {'message': 'not found'}))
+        client = WFCClient('http://localhost', transport=transport, coalesce=True)
+
+        results, errors = self.run_concurrently(client, lambda: client.get('a'))
+
+        self.assertEqual(len(transport.requests), 1)
+        self.assertTrue(all(isinstance(e, NotFoundError) for e in errors))
+
+    def test_get_list(self):
+        transport = BlockingTransport(FakeResponse(200, {'_embedded': {'files': []}}),
+                                      FakeResponse(200, {'_embedded': {'files': []}}))
+        client = WFCClient('http://localhost', transport=transport, coalesce=True)
+
+        self.run_concurrently(client, lambda: client.get_list({'a': 1, 'b': 2}, limit=10))
+        self.assertEqual(len(transport.requests), 1)
+
+        # the call is over, so the next one is sent again
+        client.get_list({'b': 2, 'a': 1}, limit=10)
+        self.assertEqual(len(transport.requests), 2)
+
+    def test_different_keys(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('a', lambda: 1), 1)
+        self.assertEqual(flight.do('b', lambda: 2), 2)
+        self.assertEqual(flight.stats(), {'calls': 2, 'shared': 0})
+        self.assertEqual(flight.in_flight(), 0)
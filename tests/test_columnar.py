@@ -0,0 +1,103 @@
+import unittest
+
+from wipac_fc import columnar
+from wipac_fc.client import ClientError
+from wipac_fc.columnar import Columns
+
+from .test_pagination import FakeListClient
+
+
+FILES = [
+    {'uuid': '1', 'file_size': 10, 'data_type': 'real', 'offline_processing_metadata': {'dataset_id': 1},
+     'locations': [{'site': 'WIPAC'}]},
+    {'uuid': '2', 'file_size': 20, 'data_type': 'simulation', 'offline_processing_metadata': {'dataset_id': 2},
+     'locations': [{'site': 'NERSC'}]},
+    {'uuid': '3', 'file_size': 2 ** 60, 'data_type': 'real', 'offline_processing_metadata': {'dataset_id': 1},
+     'locations': [{'site': 'WIPAC'}]},
+    {'uuid': '4', 'data_type': None, 'offline_processing_metadata': {}, 'locations': [{'site': 'WIPAC'}]},
+]
+
+FIELDS = {
+    'file_size': 'int',
+    'data_type': 'str',
+    'dataset_id': ('int', 'offline_processing_metadata.dataset_id'),
+    'site': ('str', lambda f: f['locations'][0]['site']),
+}
+
+
+class ColumnsTests(object):
+    def columns(self):
+        columns = Columns(FIELDS)
+        columns.extend(FILES)
+        return columns
+
+    def test_values(self):
+        columns = self.columns()
+
+        self.assertEqual(len(columns), 4)
+        self.assertEqual(list(columns['file_size']), [10, 20, 2 ** 60, 0])
+        self.assertEqual(list(columns['data_type']), ['real', 'simulation', 'real', None])
+
+    def test_aggregations(self):
+        columns = self.columns()
+
+        self.assertEqual(columns.sum('file_size'), 30 + 2 ** 60)
+        self.assertEqual(columns.count('site', 'WIPAC'), 3)
+        self.assertEqual(columns.group_by('data_type', 'file_size'), {'real': 10 + 2 ** 60, 'simulation': 20})
+        self.assertEqual(columns.group_by('site', 'file_size'), {'WIPAC': 10 + 2 ** 60, 'NERSC': 20})
+
+    def test_missing(self):
+        columns = self.columns()
+
+        # missing values are neither a group nor counted as 0
+        self.assertEqual(columns.group_by('dataset_id'), {1: 2, 2: 1})
+        self.assertEqual(columns.count('dataset_id', 0), 0)
+        self.assertEqual(columns.count('dataset_id', None), 1)
+        self.assertEqual(columns.count('data_type', None), 1)
+        self.assertEqual(list(columns.column('file_size').valid()), [1, 1, 1, 0])
+
+        columns = Columns({'livetime': 'float', 'run': 'int'})
+        columns.extend([{'livetime': 1.5, 'run': 0}, {'run': 0}, {'livetime': 2.0}])
+
+        self.assertEqual(columns.sum('livetime'), 3.5)
+        self.assertEqual(columns.group_by('run', 'livetime'), {0: 1.5})
+        self.assertEqual(columns.group_by('livetime'), {1.5: 1, 2.0: 1})
+
+    def test_keys(self):
+        self.assertEqual(self.columns().keys(), ['data_type', 'file_size', 'offline_processing_metadata'])
+
+
+@unittest.skipIf(columnar.numpy is None, 'requires numpy')
+class TestColumnsNumpy(ColumnsTests, unittest.TestCase):
+    pass
+
+
+class TestColumnsPure(ColumnsTests, unittest.TestCase):
+    def setUp(self):
+        self.numpy = columnar.numpy
+        columnar.numpy = None
+
+    def tearDown(self):
+        columnar.numpy = self.numpy
+
+
+class TestGetColumns(unittest.TestCase):
+    def test_listing(self):
+        client = FakeListClient(25)
+        for i, f in enumerate(client.files):
+            f['file_size'] = i
+
+        columns = client.get_columns({'file_size': 'int'}, page_size=10)
+
+        self.assertEqual(len(columns), 25)
+        self.assertEqual(columns.sum('file_size'), sum(range(25)))
+
+    def test_callable_needs_keys(self):
+        client = FakeListClient(5)
+        fields = {'name': ('str', lambda f: f['logical_name'])}
+
+        with self.assertRaises(ClientError):
+            client.get_columns(fields)
+
+        columns = client.get_columns(fields, keys=['uuid', 'logical_name'])
+        self.assertEqual(columns.count('name', '/data/3.i3'), 1)
@@ -0,0 +1,121 @@
+import json
+import random
+import unittest
+
+from wipac_fc import decoder
+from wipac_fc.client import BadRequestError, WFCClient
+
+from . import FakeResponse
+
+
+def chunked(raw, n):
+    cuts = sorted(random.sample(range(1, len(raw)), n))
+    return [raw[a:b] for a, b in zip([0] + cuts, cuts + [len(raw)])]
+
+
+class TestIterArray(unittest.TestCase):
+    def test_random_chunks(self):
+        files = [{'uuid': str(i), 'locations': [{'path': '/a,b]}"{', 'site': 'x\\"y'}]} for i in range(20)]
+        files += [12345, 'a]', None, [[[[[[[[[[{'deep': True}]]]]]]]]]]]
+        doc = {'files': ['/api/files/0'], '_embedded': {'other': [[1]], 'files': files}, 'tail': {'files': [1]}}
+        raw = json.dumps(doc).encode('utf-8')
+
+        # the standard library decodes in place, other backends get the json text
+        for loads in (json.loads, lambda text: json.loads(text)):
+            for _ in range(50):
+                chunks = chunked(raw, random.randint(0, 30))
+                self.assertEqual(list(decoder.iter_array(chunks, ('_embedded', 'files'), loads)), files)
+
+    def test_empty_and_missing(self):
+        self.assertEqual(list(decoder.iter_array([b'{"_embedded": {"files": [ ]}}'], ('_embedded', 'files'))), [])
+        self.assertEqual(list(decoder.iter_array([b'{"files": [1, 2]}'], ('_embedded', 'files'))), [])
+        self.assertEqual(list(decoder.iter_array([b'{"files": [1, 2]}'], ('files',))), [1, 2])
+        self.assertEqual(list(decoder.iter_array([b'{"files": [1, 2]}'], ('files',), str)), ['1', '2'])
+
+    def test_split_object(self):
+        raw = '{"a": [[[[[[[[[[1]]]]]]]]]], "b\\"c" : "x}\\"", "n":-1.5e3,"o": {"p": {}}, "t": true}'
+
+        self.assertEqual(decoder.split_object(raw), [
+            ('a', '[[[[[[[[[[1]]]]]]]]]]'), ('b"c', '"x}\\""'), ('n', '-1.5e3'), ('o', '{"p": {}}'), ('t', 'true'),
+        ])
+        self.assertEqual(decoder.split_object(b' { } '), [])
+
+        # empty containers at the top level
+        self.assertEqual(decoder.split_object('{"x": 1, "a": {}, "b": { }, "l": [{}, []], "c": 1}'),
+                         [('x', '1'), ('a', '{}'), ('b', '{ }'), ('l', '[{}, []]'), ('c', '1')])
+
+        for raw in ('[1]', '{"a": 1', '{"a": [1', '{"a" 1}'):
+            with self.assertRaises(ValueError):
+                decoder.split_object(raw)
+
+    def test_chunk_boundaries(self):
+        path = ('_embedded', 'files')
+
+        for loads in (json.loads, lambda text: json.loads(text)):
+            # numbers split at a chunk boundary
+            self.assertEqual(list(decoder.iter_array([b'{"_embedded": {"files": [1.', b'5]}}'], path, loads)), [1.5])
+            self.assertEqual(list(decoder.iter_array([b'{"_embedded": {"files": [2, 1.5e', b'+', b'2 ]}}'], path,
+                                                     loads)), [2, 150.0])
+
+            # one large element in many small chunks
+            files = [{'data': ['x' * 50] * 200, 'n': [{}]}] * 3
+            raw = json.dumps({'_embedded': {'files': files}}).encode('utf-8')
+            self.assertEqual(list(decoder.iter_array([raw[i:i + 7] for i in range(0, len(raw), 7)], path, loads)),
+                             files)
+
+    def test_backends(self):
+        self.assertIs(decoder.get_decoder('json'), json.loads)
+        self.assertIs(decoder.get_decoder(len), len)
+        self.assertEqual(decoder.get_decoder()(b'{"a": 1}'), {'a': 1})
+
+        with self.assertRaises(ValueError):
+            decoder.get_decoder('yaml')
+
+
+class ListTransport(object):
+    """
+    Answers list requests from an in-memory list of files.
+    """
+
+    def __init__(self, total):
+        self.files = [{'uuid': str(i), 'file_size': i} for i in range(total)]
+        self.streamed = []
+
+    def request(self, method, url, params=None, stream=False, **kwargs):
+        self.streamed.append(stream)
+
+        if params['limit'] > 100:
+            return FakeResponse(400, {'message': 'invalid query parameters'})
+
+        files = self.files[params['start']:params['start'] + params['limit']]
+        return FakeResponse(200, {'_embedded': {'files': files}, 'files': ['/api/files/' + f['uuid'] for f in files]})
+
+
+class TestStreamedListing(unittest.TestCase):
+    def test_stream(self):
+        for prefetch in (0, 2):
+            transport = ListTransport(45)
+            client = WFCClient('http://localhost', transport=transport)
+            files = list(client.iter_list(page_size=10, prefetch=prefetch, stream=True))
+
+            self.assertEqual(files, transport.files)
+            self.assertTrue(all(transport.streamed))
+
+    def test_backend(self):
+        decoded = []
+
+        def loads(raw):
+            decoded.append(raw)
+            return json.loads(raw)
+
+        transport = ListTransport(15)
+        client = WFCClient('http://localhost', transport=transport, json_backend=loads)
+
+        self.assertEqual(list(client.iter_list(page_size=10, stream=True)), transport.files)
+        self.assertEqual(len(decoded), 15)
+
+    def test_error(self):
+        client = WFCClient('http://localhost', transport=ListTransport(10))
+
+        with self.assertRaises(BadRequestError):
+            list(client.iter_list(page_size=1000, stream=True))
@@ -0,0 +1,96 @@
+import unittest
+
+from wipac_fc import dedup, ingest
+from wipac_fc.client import WFCClient
+from wipac_fc.dedup import BloomFilter, DuplicateIndex, FingerprintSet, _hashes
+from wipac_fc.testing import FakeServer
+
+
+def make_file(i, checksum=None, site='WIPAC'):
+    return {
+        'logical_name': '/data/file%d.i3' % i,
+        'checksum': {'sha512': checksum or '%0128x' % i},
+        'locations': [{'site': site, 'path': '/data/file%d.i3' % i}],
+    }
+
+
+class TestFingerprintSet(unittest.TestCase):
+    def test_membership_across_merges(self):
+        keys = FingerprintSet(capacity=20000)
+        for i in range(20000):
+            keys.add('key%d' % i)
+        keys.add('key0')
+
+        self.assertEqual(len(keys), 20000)
+        self.assertTrue(all('key%d' % i in keys for i in range(0, 20000, 7)))
+        self.assertFalse(any('other%d' % i in keys for i in range(1000)))
+
+    def test_fingerprint_collision(self):
+        keys = FingerprintSet(capacity=100)
+        hashes = dedup._hashes
+        dedup._hashes = lambda key: (42, 7)
+        try:
+            keys.add('known')
+            self.assertFalse('other' in keys)
+            keys._merge()
+            self.assertTrue('known' in keys)
+            self.assertFalse('other' in keys)
+        finally:
+            dedup._hashes = hashes
+
+    def test_pure_python_merge(self):
+        numpy = dedup.numpy
+        dedup.numpy = None
+        try:
+            self.test_membership_across_merges()
+        finally:
+            dedup.numpy = numpy
+
+    def test_bloom_error_rate(self):
+        bloom = BloomFilter(10000, 0.01)
+        for i in range(10000):
+            bloom.add(*_hashes('key%d' % i))
+
+        false_positives = sum(_hashes('other%d' % i) in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TestDuplicateIndex(unittest.TestCase):
+    def test_check(self):
+        index = DuplicateIndex(capacity=100)
+        index.add(make_file(1))
+
+        self.assertEqual(index.check(make_file(1)), ingest.DUPLICATE)
+        self.assertEqual(index.check(make_file(1, site='NERSC')), ingest.REPLICA)
+        self.assertEqual(index.check(make_file(1, checksum='other')), ingest.CONFLICT)
+        self.assertEqual(index.check(make_file(2)), dedup.NEW)
+
+    def test_check_common_algorithms(self):
+        index = DuplicateIndex(capacity=100)
+        catalog = make_file(1)
+        catalog['checksum']['adler32'] = '01234567'
+        index.add(catalog)
+
+        self.assertEqual(index.check(make_file(1)), ingest.DUPLICATE)
+        self.assertEqual(index.check(make_file(1, checksum='other')), ingest.CONFLICT)
+
+        local = make_file(1)
+        local['checksum'] = {'md5': '0' * 32}
+        self.assertEqual(index.check(local), dedup.NEW)
+
+    def test_create_many(self):
+        with FakeServer() as server:
+            for i in range(5):
+                server.catalog.add(make_file(i))
+
+            client = WFCClient(server.url, server.port)
+            index = DuplicateIndex.from_listing(client, page_size=2)
+            self.assertEqual(len(index), 5)
+
+            records = [make_file(0), make_file(1, checksum='other'), make_file(2, site='NERSC'),
+                       make_file(5), make_file(5)]
+            results = list(client.create_many(records, max_workers=1, ordered=True, dedup=index))
+
+            self.assertEqual([r.status for r in results],
+                             [ingest.DUPLICATE, ingest.CONFLICT, ingest.REPLICA, ingest.CREATED, ingest.DUPLICATE])
+            self.assertEqual(server.catalog.requests['POST'], 2)
@@ -0,0 +1,75 @@
+import unittest
+
+from wipac_fc.client import PreconditionFailedError, WFCClient
+
+from . import FakeResponse, RecordingTransport
+
+
+class TestETags(unittest.TestCase):
+    def client(self, *responses):
+        self.transport = RecordingTransport(*responses)
+        return WFCClient('http://localhost', transport=self.transport)
+
+    def sent(self):
+        return [(m, kwargs.get('headers')) for m, _, kwargs in self.transport.requests]
+
+    def test_reuses_etag_from_get(self):
+        client = self.client(FakeResponse(200, {'uuid': 'a'}, {'etag': 'e1'}),
+                             FakeResponse(200, {}, {'etag': 'e2'}),
+                             FakeResponse(200, {}, {'etag': 'e3'}))
+        client.get('a')
+        client.update('a', {'x': 1})
+        client.replace('a', {'x': 2})
+
+        self.assertEqual(self.sent(), [('GET', None),
+                                       ('PATCH', {'If-None-Match': 'e1'}),
+                                       ('PUT', {'If-None-Match': 'e2'})])
+
+    def test_reuses_etag_from_create(self):
+        client = self.client(FakeResponse(201, {'file': '/api/files/a'}, {'etag': 'e1'}),
+                             FakeResponse(200, {}))
+        client.create({'logical_name': '/a'})
+        client.update('a', {'x': 1})
+
+        self.assertEqual(self.sent()[1], ('PATCH', {'If-None-Match': 'e1'}))
+
+    def test_fetches_unknown_etag(self):
+        client = self.client(FakeResponse(200, {'uuid': 'a'}, {'etag': 'e1'}),
+                             FakeResponse(200, {}))
+        client.update('a', {'x': 1})
+
+        self.assertEqual(self.sent(), [('GET', None), ('PATCH', {'If-None-Match': 'e1'})])
+
+    def test_refetches_outdated_etag(self):
+        client = self.client(FakeResponse(200, {'uuid': 'a'}, {'etag': 'old'}),
+                             FakeResponse(412, {'message': 'etag mismatch'}),
+                             FakeResponse(200, {'uuid': 'a'}, {'etag': 'new'}),
+                             FakeResponse(200, {}))
+        client.get('a')
+        client.update('a', {'x': 1})
+
+        self.assertEqual(self.sent()[1:], [('PATCH', {'If-None-Match': 'old'}),
+                                           ('GET', None),
+                                           ('PATCH', {'If-None-Match': 'new'})])
+
+    def test_explicit_etag_is_not_retried(self):
+        client = self.client(FakeResponse(412, {'message': 'etag mismatch'}))
+
+        with self.assertRaises(PreconditionFailedError):
+            client.update('a', {'x': 1}, etag='mine')
+
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_without_precondition(self):
+        client = self.client(FakeResponse(200, {}))
+        client.update('a', {'x': 1}, etag=False)
+
+        self.assertEqual(self.sent(), [('PATCH', {})])
+
+    def test_delete_forgets_etag(self):
+        client = self.client(FakeResponse(200, {'uuid': 'a'}, {'etag': 'e1'}),
+                             FakeResponse(204))
+        client.get('a')
+        client.delete('a')
+
+        self.assertNotIn('a', client._etags)
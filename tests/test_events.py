@@ -0,0 +1,81 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from wipac_fc.client import WFCClient
+from wipac_fc.events import EventIndex
+from wipac_fc.testing import FakeServer
+
+
+def make_file(uid, first, last, site='WIPAC'):
+    return {
+        'uuid': uid,
+        'offline_processing_metadata': {'dataset_id': 1, 'run_id': 2, 'first_event': first, 'last_event': last},
+        'locations': [{'site': site, 'path': '/data/' + uid}],
+    }
+
+
+class TestEventIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = EventIndex(1, 2, [
+            (200, 299, 'c', [{'site': 'WIPAC', 'path': '/data/c'}]),
+            (0, 99, 'a', [{'site': 'WIPAC', 'path': '/data/a'}]),
+            (100, 199, 'b', [{'site': 'NERSC', 'path': '/data/b'}]),
+            # a long file overlapping `b` and `c`
+            (150, 250, 'd', [{'site': 'WIPAC', 'path': '/data/d'}]),
+        ])
+
+    def test_lookup(self):
+        self.assertEqual([uid for uid, _ in self.index.lookup(0)], ['a'])
+        self.assertEqual([uid for uid, _ in self.index.lookup(99)], ['a'])
+        self.assertEqual([uid for uid, _ in self.index.lookup(160)], ['b', 'd'])
+        self.assertEqual([uid for uid, _ in self.index.lookup(220)], ['d', 'c'])
+        self.assertEqual(self.index.lookup(300), [])
+        self.assertEqual(self.index.lookup(-1), [])
+
+    def test_wide_file(self):
+        random.seed(1)
+        files = [(i * 10, i * 10 + random.randint(0, 30), str(i), []) for i in range(1000)]
+        files.append((5, 10 ** 6, 'wide', []))
+        index = EventIndex(1, 2, files)
+
+        for e in [0, 5, 4321, 9995, 10 ** 6, 10 ** 6 + 1] + [random.randint(0, 10100) for _ in range(200)]:
+            expected = sorted(uid for first, last, uid, _ in files if first <= e <= last)
+            self.assertEqual(sorted(uid for uid, _ in index.lookup(e)), expected)
+
+        self.assertEqual(EventIndex(1, 2).lookup(5), [])
+
+    def test_paths(self):
+        self.assertEqual(self.index.paths([50, 160, 1000]),
+                         {50: ['/data/a'], 160: ['/data/b', '/data/d'], 1000: []})
+        self.assertEqual(self.index.paths([160], site='WIPAC'), {160: ['/data/d']})
+
+    def test_build(self):
+        with FakeServer() as server:
+            for f in [make_file('a', 0, 99), make_file('b', 100, 199), make_file('c', 200, 299),
+                      {'uuid': 'x', 'offline_processing_metadata': {'dataset_id': 1, 'run_id': 2}}]:
+                f['content_status'] = 'bad' if f['uuid'] == 'c' else 'good'
+                server.catalog.add(f)
+
+            other = make_file('y', 0, 99)
+            other['offline_processing_metadata']['run_id'] = 3
+            server.catalog.add(other)
+
+            client = WFCClient(server.url, server.port)
+            index = EventIndex.build(client, 1, 2, {'content_status': 'good'}, page_size=1)
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.paths([50, 150, 250]), {50: ['/data/a'], 150: ['/data/b'], 250: []})
+
+    def test_save_and_load(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'index.json')
+
+        self.index.save(path)
+        index = EventIndex.load(path)
+
+        self.assertEqual((index.dataset_id, index.run_id, len(index)), (1, 2, 4))
+        self.assertEqual(index.lookup_many([160, 220]), self.index.lookup_many([160, 220]))
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from wipac_fc import ingest
+from wipac_fc.client import ConflictError, WFCClient
+from wipac_fc.testing import FakeServer
+
+from . import FakeResponse
+
+
+def logical_name(path):
+    return '/data/' + os.path.basename(path)
+
+
+class CreateTransport(object):
+    """
+    Answers creates depending on the logical name of the file.
+    """
+
+    def __init__(self):
+        self.posted = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, data=None, **kwargs):
+        metadata = json.loads(data)
+        with self.lock:
+            self.posted.append(metadata['logical_name'])
+
+        kind = metadata['logical_name'].split('/')[1]
+        if kind == 'conflict':
+            return FakeResponse(409, {'message': 'conflict with existing file'})
+        elif kind == 'replica':
+            return FakeResponse(200, {'file': '/api/files/x'})
+        elif kind == 'bad':
+            return FakeResponse(400, {'message': 'bad request'})
+
+        return FakeResponse(201, {'file': '/api/files/x'})
+
+
+class TestCreateMany(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.transport = CreateTransport()
+        self.client = WFCClient('http://localhost', transport=self.transport)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def records(self, names):
+        return ({'logical_name': n, 'checksum': {'sha512': n}} for n in names)
+
+    def test_outcomes(self):
+        names = ['/new/1', '/replica/1', '/conflict/1', '/bad/1', '/new/2']
+        results = list(self.client.create_many(self.records(names), max_workers=2, ordered=True))
+
+        self.assertEqual([r.metadata['logical_name'] for r in results], names)
+        self.assertEqual([r.status for r in results],
+                         [ingest.CREATED, ingest.REPLICA, ingest.CONFLICT, ingest.FAILED, ingest.CREATED])
+        self.assertIsInstance(results[2].error, ConflictError)
+
+    def test_resume_from_checkpoint(self):
+        path = os.path.join(self.tmpdir, 'checkpoint')
+        names = ['/new/%d' % i for i in range(20)] + ['/conflict/1']
+
+        # interrupted after a few records
+        results = self.client.create_many(self.records(names), max_workers=2, ordered=True, checkpoint=path)
+        for _ in range(5):
+            next(results)
+        results.close()
+
+        # creates that were in flight are in the checkpoint, so no record is posted twice
+        results = list(self.client.create_many(self.records(names), max_workers=4, checkpoint=path))
+
+        self.assertGreaterEqual(sum(r.status == ingest.SKIPPED for r in results), 5)
+        self.assertEqual(len(self.transport.posted), len(names))
+        self.assertEqual(sorted(self.transport.posted), sorted(names))
+
+        # everything except the conflict is done now
+        self.transport.posted = []
+        list(self.client.create_many(self.records(names), checkpoint=path))
+        self.assertEqual(self.transport.posted, ['/conflict/1'])
+
+        with ingest.Checkpoint(path) as checkpoint:
+            self.assertEqual(len(checkpoint), 20)
+
+
+class TestRegisterFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        self.paths = []
+        for i in range(6):
+            path = os.path.join(self.tmpdir, 'file%d.i3' % i)
+            with open(path, 'wb') as f:
+                f.write(os.urandom(1000 * i))
+            self.paths.append(path)
+
+    def test_checksum_file(self):
+        with open(self.paths[5], 'rb') as f:
+            expected = hashlib.sha512(f.read()).hexdigest()
+
+        self.assertEqual(ingest.checksum_file(self.paths[5], buffer_size=128), (expected, 5000))
+        self.assertEqual(ingest.checksum_file(self.paths[0])[1], 0)
+
+    def test_register(self):
+        missing = os.path.join(self.tmpdir, 'missing.i3')
+
+        with FakeServer() as server:
+            client = WFCClient(server.url, server.port)
+            results = list(client.register_files(self.paths + [missing], 'WIPAC', logical_name=logical_name,
+                                                 processes=2, max_workers=2))
+
+            files = dict((f['logical_name'], f) for f in server.catalog.files.values())
+
+        self.assertEqual(sorted(r.status for r in results), [ingest.CREATED] * 6 + [ingest.FAILED])
+        self.assertEqual(sorted(files), ['/data/file%d.i3' % i for i in range(6)])
+
+        f = files['/data/file3.i3']
+        self.assertEqual(f['file_size'], 3000)
+        self.assertEqual(f['checksum'], {'sha512': ingest.checksum_file(self.paths[3])[0]})
+        self.assertEqual(f['locations'], [{'site': 'WIPAC', 'path': self.paths[3]}])
+
+        failed = [r for r in results if r.status == ingest.FAILED][0]
+        self.assertEqual(failed.metadata['locations'][0]['path'], missing)
+        self.assertIsInstance(failed.error, EnvironmentError)
+
+    def test_resume_without_hashing(self):
+        path = os.path.join(self.tmpdir, 'checkpoint')
+
+        with FakeServer() as server:
+            client = WFCClient(server.url, server.port)
+            list(client.register_files(self.paths[:4], 'WIPAC', processes=1, checkpoint=path))
+
+            # a changed file is hashed and created again
+            with open(self.paths[1], 'ab') as f:
+                f.write(b'more')
+
+            results = list(client.register_files(self.paths, 'WIPAC', processes=1, checkpoint=path))
+            posted = server.catalog.requests['POST']
+
+        skipped = sorted(r.metadata['locations'][0]['path'] for r in results if r.status == ingest.SKIPPED)
+        self.assertEqual(skipped, [self.paths[0], self.paths[2], self.paths[3]])
+        self.assertEqual(posted, 4 + 3)
+
+        # the changed file conflicts with its old checksum and is not checkpointed
+        with ingest.Checkpoint(path, key=ingest.file_key) as checkpoint:
+            self.assertEqual(len(checkpoint), 6)
+            self.assertIn(self.paths[5], checkpoint)
+            self.assertNotIn(self.paths[1], checkpoint)
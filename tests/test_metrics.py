@@ -0,0 +1,82 @@
+import unittest
+
+from wipac_fc.client import NotFoundError, WFCClient
+from wipac_fc.metrics import Metrics
+from wipac_fc.ratelimit import RateController
+
+from . import FakeResponse, RecordingTransport
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.transport = RecordingTransport(FakeResponse(200, {'_embedded': {'files': []}}),
+                                            FakeResponse(200, {'uuid': 'a'}),
+                                            FakeResponse(404, {'message': 'not found'}),
+                                            FakeResponse(201, {'file': '/api/files/b'}))
+        self.client = WFCClient('http://localhost', transport=self.transport, metrics=self.metrics)
+
+    def test_snapshot(self):
+        self.client.get_list()
+        self.client.get('a')
+        with self.assertRaises(NotFoundError):
+            self.client.get('b')
+        self.client.create({'uuid': 'b'})
+
+        snapshot = self.metrics.snapshot()
+
+        self.assertEqual(sorted(snapshot), ['GET files', 'GET files/<uid>', 'POST files'])
+        self.assertEqual(snapshot['GET files/<uid>']['count'], 2)
+        self.assertEqual(snapshot['GET files/<uid>']['status'], {200: 1, 404: 1})
+        self.assertEqual(snapshot['GET files/<uid>']['latency']['buckets']['+Inf'], 2)
+        self.assertEqual(snapshot['POST files']['request_bytes'], len('{"uuid": "b"}'))
+        self.assertEqual(snapshot['GET files']['response_bytes'], len('{"_embedded": {"files": []}}'))
+
+    def test_streamed(self):
+        url = 'http://localhost/api/files'
+        full = FakeResponse(200, {'_embedded': {'files': [{'uuid': 'a'}]}})
+        partial = FakeResponse(200, {'_embedded': {'files': [{'uuid': 'b'}]}})
+
+        self.metrics.measure('GET', 'files', url, {'stream': True}, lambda: full)
+        self.metrics.measure('GET', 'files', url, {'stream': True}, lambda: partial)
+        self.assertEqual(self.metrics.snapshot(), {})
+
+        # recorded when the body has been read, or when the response is closed
+        self.assertEqual(b''.join(full.iter_content(4)), full.content)
+        full.close()
+        self.assertEqual(self.metrics.snapshot()['GET files']['count'], 1)
+
+        next(partial.iter_content(4))
+        partial.close()
+
+        series = self.metrics.snapshot()['GET files']
+        self.assertEqual(series['count'], 2)
+        self.assertEqual(series['response_bytes'], len(full.content) + 4)
+
+    def test_hooks(self):
+        calls = []
+        self.metrics.add_pre_hook(lambda method, url, kwargs: calls.append(('pre', method, url)))
+        self.metrics.add_post_hook(lambda method, url, r, elapsed: calls.append(('post', r.status_code)))
+
+        self.client.get_list()
+
+        self.assertEqual(calls, [('pre', 'GET', 'http://localhost/api/files'), ('post', 200)])
+
+    def test_retries(self):
+        transport = RecordingTransport(FakeResponse(429, {'message': 'slow down'}), FakeResponse(200, {'uuid': 'a'}))
+        client = WFCClient('http://localhost', transport=transport, metrics=self.metrics,
+                           rate_controller=RateController(backoff=0.001))
+        client.get('a')
+
+        series = self.metrics.snapshot()['GET files/<uid>']
+        self.assertEqual(series['retries'], 1)
+        self.assertEqual(series['status'], {200: 1, 429: 1})
+
+    def test_prometheus(self):
+        self.client.get_list()
+        text = self.metrics.to_prometheus()
+
+        self.assertIn('# TYPE wfc_client_request_duration_seconds histogram\n', text)
+        self.assertIn('wfc_client_requests_total{method="GET",endpoint="files",status="200"} 1\n', text)
+        self.assertIn('wfc_client_request_duration_seconds_bucket{method="GET",endpoint="files",le="+Inf"} 1\n', text)
+        self.assertIn('wfc_client_retries_total{method="GET",endpoint="files"} 0\n', text)
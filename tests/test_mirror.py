@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from wipac_fc.client import NotFoundError, WFCClient
+from wipac_fc.mirror import Mirror
+
+
+class FakeCatalogClient(WFCClient):
+    """
+    Serves `get_list()` and `get()` from an in-memory catalog.
+    """
+
+    def __init__(self):
+        super(FakeCatalogClient, self).__init__('http://localhost')
+        self.files = {}
+        self.gets = 0
+
+    def put(self, uid, run_id, modified, **extra):
+        self.files[uid] = dict({'uuid': uid, 'logical_name': '/data/' + uid, 'meta_modify_date': modified,
+                                'offline_processing_metadata': {'dataset_id': 1, 'run_id': run_id}}, **extra)
+
+    def matches(self, f, query):
+        for k, v in query.items():
+            value = f
+            for part in k.split('.'):
+                value = value.get(part, {})
+            if isinstance(v, dict):
+                if value < v['$gte']:
+                    return False
+            elif value != v:
+                return False
+        return True
+
+    def get_list(self, query={}, start=None, limit=None, keys=None):
+        files = [{'uuid': u} for u, f in sorted(self.files.items()) if self.matches(f, query)]
+        return {'_embedded': {'files': files[start:start + limit]}}
+
+    def get(self, uid):
+        self.gets += 1
+        if uid not in self.files:
+            raise NotFoundError('not found')
+        return self.files[uid]
+
+
+class TestMirror(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.client = FakeCatalogClient()
+        for i in range(10):
+            self.client.put('f%d' % i, run_id=100 + i % 2, modified='2020-01-01T00:00:0%d' % i)
+
+        self.mirror = Mirror(self.client, os.path.join(self.tmpdir, 'mirror.sqlite'), page_size=3)
+        self.query = {'offline_processing_metadata.dataset_id': 1}
+
+    def tearDown(self):
+        self.mirror.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_incremental_sync(self):
+        self.assertIsNone(self.mirror.staleness(self.query))
+        self.assertEqual(self.mirror.sync(self.query), {'fetched': 10, 'removed': 0})
+
+        self.client.put('f3', run_id=101, modified='2020-01-02T00:00:00', content_status='bad')
+        self.client.put('f10', run_id=100, modified='2020-01-02T00:00:01')
+        self.client.gets = 0
+        result = self.mirror.sync(self.query)
+
+        # the two changed files and the one at the previous boundary
+        self.assertEqual(result['fetched'], 3)
+        self.assertEqual(self.client.gets, 3)
+
+        files = list(self.mirror.query({'offline_processing_metadata.run_id': 101}))
+        self.assertEqual(sorted(f['uuid'] for f in files), ['f1', 'f3', 'f5', 'f7', 'f9'])
+
+        bad = list(self.mirror.query({'content_status': 'bad'}, synced_query=self.query))
+        self.assertEqual([f['uuid'] for f in bad], ['f3'])
+
+        status = self.mirror.staleness(self.query)
+        self.assertEqual(status['files'], 11)
+        self.assertEqual(status['modified'], '2020-01-02T00:00:01')
+
+    def test_full_sync_removes_deleted(self):
+        self.mirror.sync(self.query)
+        del self.client.files['f0']
+
+        self.assertEqual(self.mirror.sync(self.query)['removed'], 0)
+        self.assertEqual(self.mirror.sync(self.query, full=True)['removed'], 1)
+        self.assertEqual(list(self.mirror.query({'uuid': 'f0'})), [])
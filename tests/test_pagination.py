@@ -0,0 +1,135 @@
+import threading
+import unittest
+
+from wipac_fc.client import ClientError, NotFoundError, WFCClient
+
+
+class FakeListClient(WFCClient):
+    """
+    Serves `get_list()` from an in-memory list of files.
+    """
+
+    def __init__(self, total):
+        super(FakeListClient, self).__init__('http://localhost', 8888)
+        self.files = [{'uuid': str(i), 'logical_name': '/data/%d.i3' % i} for i in range(total)]
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_list(self, query={}, start=None, limit=None, keys=None):
+        with self.lock:
+            self.calls.append((start, limit))
+
+        return {'_embedded': {'files': self.files[start:start + limit]}}
+
+
+class TestIterList(unittest.TestCase):
+    def test_all_pages_in_order(self):
+        for prefetch in (0, 1, 3):
+            client = FakeListClient(25)
+            files = list(client.iter_list(page_size=10, prefetch=prefetch))
+
+            self.assertEqual([f['uuid'] for f in files], [str(i) for i in range(25)])
+
+    def test_exact_multiple_of_page_size(self):
+        client = FakeListClient(20)
+        files = list(client.iter_list(page_size=10, prefetch=0))
+
+        self.assertEqual(len(files), 20)
+        self.assertEqual(client.calls, [(0, 10), (10, 10), (20, 10)])
+
+    def test_empty(self):
+        client = FakeListClient(0)
+        self.assertEqual(list(client.iter_list(page_size=10, prefetch=2)), [])
+
+    def test_prefetch_is_bounded(self):
+        client = FakeListClient(1000)
+        it = client.iter_list(page_size=10, prefetch=2)
+        next(it)
+        it.close()
+
+        # current page plus at most two pages ahead
+        self.assertLessEqual(len(client.calls), 3)
+
+    def test_errors_propagate(self):
+        client = FakeListClient(0)
+
+        def get_list(query={}, start=None, limit=None, keys=None):
+            raise NotFoundError('not found')
+
+        client.get_list = get_list
+
+        with self.assertRaises(NotFoundError):
+            list(client.iter_list(prefetch=1))
+
+    def test_invalid_arguments(self):
+        client = FakeListClient(0)
+
+        with self.assertRaises(ClientError):
+            list(client.iter_list(query=42))
+
+        with self.assertRaises(ClientError):
+            list(client.iter_list(page_size=0))
+
+
+class FakeProjectionClient(FakeListClient):
+    """
+    Serves listings with or without support for `keys`, and `get()` for the fallback.
+    """
+
+    def __init__(self, total, supports_keys):
+        super(FakeProjectionClient, self).__init__(total)
+        self.supports_keys = supports_keys
+        self.keys = []
+        self.gets = 0
+
+        for f in self.files:
+            f['file_size'] = int(f['uuid'])
+
+    def get_list(self, query={}, start=None, limit=None, keys=None):
+        self.keys.append(keys)
+        files = self.files[start:start + limit]
+
+        if not self.supports_keys:
+            return {'_embedded': {'files': [{'uuid': f['uuid'], 'logical_name': f['logical_name']} for f in files]}}
+
+        return {'_embedded': {'files': [dict((k, f[k]) for k in keys if k in f) for f in files]}}
+
+    def get(self, uid):
+        with self.lock:
+            self.gets += 1
+
+        return self.files[int(uid)]
+
+
+class TestIterListKeys(unittest.TestCase):
+    def test_projection(self):
+        client = FakeProjectionClient(25, supports_keys=True)
+        files = list(client.iter_list(page_size=10, keys=['uuid', 'file_size']))
+
+        self.assertEqual([f['file_size'] for f in files], list(range(25)))
+        self.assertEqual(client.keys, [['uuid', 'file_size']] * 3)
+        self.assertEqual(client.gets, 0)
+
+    def test_projection_without_values(self):
+        client = FakeProjectionClient(25, supports_keys=True)
+        files = list(client.iter_list(page_size=10, keys=['uuid', 'missing']))
+
+        self.assertEqual(files, [{'uuid': str(i)} for i in range(25)])
+        self.assertEqual(client.gets, 0)
+
+        # probed once
+        self.assertEqual(client.keys.count(['uuid']), 1)
+
+    def test_fallback(self):
+        client = FakeProjectionClient(25, supports_keys=False)
+        files = list(client.iter_list(page_size=10, prefetch=0, keys=['uuid', 'file_size']))
+
+        self.assertEqual([f['file_size'] for f in files], list(range(25)))
+        self.assertEqual(client.gets, 25)
+
+        # `uuid` is always requested
+        client = FakeProjectionClient(5, supports_keys=False)
+        files = list(client.iter_list(page_size=10, keys=['file_size']))
+
+        self.assertEqual(files[3], {'uuid': '3', 'logical_name': '/data/3.i3', 'file_size': 3})
+        self.assertTrue(all('uuid' in keys for keys in client.keys))
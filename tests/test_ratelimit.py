@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+
+from wipac_fc.client import TooManyRequestsError, WFCClient
+from wipac_fc.ratelimit import RateController, retry_after
+
+from . import FakeResponse, RecordingTransport
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(retry_after(FakeResponse(429, headers={'retry-after': '2'})), 2.0)
+        self.assertIsNone(retry_after(FakeResponse(429)))
+        self.assertEqual(retry_after(FakeResponse(429, headers={'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'})), 0.0)
+
+
+class TestRateController(unittest.TestCase):
+    def test_retries_throttled_requests(self):
+        controller = RateController(backoff=0.001)
+        transport = RecordingTransport(FakeResponse(429, {'message': 'slow down'}, {'retry-after': '0.01'}),
+                                       FakeResponse(503, {'message': 'unavailable'}),
+                                       FakeResponse(200, {'uuid': 'a'}))
+        client = WFCClient('http://localhost', transport=transport, rate_controller=controller)
+
+        start = time.time()
+        self.assertEqual(client.get('a'), {'uuid': 'a'})
+        self.assertGreaterEqual(time.time() - start, 0.01)
+        self.assertEqual(controller.retries, 2)
+        self.assertEqual(controller.throttled, 2)
+
+    def test_gives_up(self):
+        controller = RateController(max_retries=1, backoff=0.001)
+        transport = RecordingTransport(FakeResponse(429, {'message': 'slow down'}),
+                                       FakeResponse(429, {'message': 'slow down'}))
+        client = WFCClient('http://localhost', transport=transport, rate_controller=controller)
+
+        with self.assertRaises(TooManyRequestsError):
+            client.get('a')
+
+    def test_aimd(self):
+        controller = RateController(concurrency=8, min_concurrency=2, max_retries=0)
+        controller.call(lambda: FakeResponse(429))
+        self.assertEqual(controller.limit, 4)
+
+        controller.call(lambda: FakeResponse(429))
+        controller.call(lambda: FakeResponse(429))
+        self.assertEqual(controller.limit, 2)
+
+        for _ in range(10):
+            controller.call(lambda: FakeResponse(200))
+        self.assertGreater(controller.limit, 4)
+
+    def test_errors_keep_limit(self):
+        controller = RateController(concurrency=4)
+
+        def send():
+            raise IOError('connection reset')
+
+        for _ in range(5):
+            with self.assertRaises(IOError):
+                controller.call(send)
+
+        self.assertEqual(controller.limit, 4)
+        self.assertEqual(controller.stats()['in_flight'], 0)
+
+    def test_concurrency_limit(self):
+        controller = RateController(concurrency=3, max_concurrency=3)
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def send():
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.01)
+            with lock:
+                state['active'] -= 1
+            return FakeResponse(200)
+
+        threads = [threading.Thread(target=controller.call, args=(send,)) for _ in range(12)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(state['peak'], 3)
+        self.assertEqual(controller.stats()['in_flight'], 0)
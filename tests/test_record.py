@@ -0,0 +1,63 @@
+import json
+import unittest
+
+from wipac_fc.client import WFCClient
+from wipac_fc.record import FileRecord
+
+from .test_decoder import ListTransport
+
+
+METADATA = {
+    'uuid': 'a',
+    'logical_name': '/data/a.i3',
+    'file_size': 42,
+    'checksum': {'sha512': 'abc'},
+    'locations': [{'site': 'WIPAC', 'path': '/data/a.i3'}],
+    'offline_processing_metadata': {'run_id': 1, 'first_event': 2},
+    'processing_level': 'L2',
+}
+
+
+class TestFileRecord(unittest.TestCase):
+    def test_lazy(self):
+        r = FileRecord.from_json(json.dumps(METADATA).encode('utf-8'))
+
+        self.assertEqual(r.file_size, 42)
+        self.assertEqual(sorted(r._raw), ['checksum', 'locations', 'offline_processing_metadata'])
+        self.assertIn('locations', r)
+        self.assertIn('locations', r._raw)
+
+        self.assertEqual(r.locations[0]['site'], 'WIPAC')
+        self.assertEqual(r['offline_processing_metadata']['run_id'], 1)
+        self.assertEqual(sorted(r._raw), ['checksum'])
+
+    def test_empty_containers(self):
+        metadata = {'uuid': 'a', 'offline_processing_metadata': {}, 'locations': [{}], 'file_size': 42,
+                    'content_status': 'good'}
+        r = FileRecord.from_json(json.dumps(metadata))
+
+        self.assertEqual((r.file_size, r.content_status), (42, 'good'))
+        self.assertEqual(r.to_dict(), metadata)
+
+    def test_dict_interface(self):
+        for r in (FileRecord.from_json(json.dumps(METADATA).encode('utf-8')), FileRecord.from_dict(METADATA)):
+            self.assertEqual(r, METADATA)
+            self.assertEqual(r.to_dict(), METADATA)
+            self.assertEqual(len(r), len(METADATA))
+            self.assertEqual(sorted(r.keys()), sorted(METADATA))
+            self.assertEqual(r.get('content_status', 'good'), 'good')
+            self.assertNotIn('content_status', r)
+
+            with self.assertRaises(KeyError):
+                r['content_status']
+
+            with self.assertRaises(AttributeError):
+                r.content_status
+
+    def test_listing(self):
+        transport = ListTransport(25)
+        client = WFCClient('http://localhost', transport=transport)
+        files = list(client.iter_list(page_size=10, records=True))
+
+        self.assertTrue(all(isinstance(f, FileRecord) for f in files))
+        self.assertEqual([f.file_size for f in files], list(range(25)))
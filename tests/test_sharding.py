@@ -0,0 +1,82 @@
+import unittest
+
+from wipac_fc.client import BadRequestError, ClientError, WFCClient
+from wipac_fc.sharding import iter_sharded, range_queries
+from wipac_fc.testing import FakeFileCatalog, FakeServer, matches
+
+
+def make_file(i):
+    f = {'uuid': 'uid-{:03d}'.format(i), 'logical_name': '/data/{:03d}.i3'.format(i), 'file_size': i}
+    if i % 10:
+        f['run'] = i // 10
+    return f
+
+
+class TestRangeQueries(unittest.TestCase):
+    def test_disjoint_and_complete(self):
+        queries = range_queries({'file_size': {'$gt': 1}}, 'run', [2, 5])
+        self.assertEqual(len(queries), 4)
+
+        files = [make_file(i) for i in range(100)]
+        for f in files:
+            self.assertEqual(sum(1 for q in queries if matches(f, q)), 1 if f['file_size'] > 1 else 0)
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ClientError):
+            range_queries({}, 'run', [])
+        with self.assertRaises(ClientError):
+            range_queries({}, 'run', [3, 3])
+
+
+class TestIterListSharded(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer(FakeFileCatalog(max_limit=7)).start()
+        self.addCleanup(self.server.stop)
+
+        for i in range(100):
+            self.server.catalog.add(make_file(i))
+
+        self.client = WFCClient(self.server.url, self.server.port)
+        self.expected = ['uid-{:03d}'.format(i) for i in range(100)]
+
+    def test_offset_windows(self):
+        files = list(self.client.iter_list_sharded(page_size=7, window=20, max_workers=3, ordered=True))
+        self.assertEqual([f['uuid'] for f in files], self.expected)
+
+        files = list(self.client.iter_list_sharded(page_size=7, window=20, max_workers=3))
+        self.assertEqual(sorted(f['uuid'] for f in files), self.expected)
+
+    def test_ranges(self):
+        files = list(self.client.iter_list_sharded(key='run', bounds=range(0, 10, 3), page_size=7,
+                                                   keys=['file_size'], ordered=True))
+
+        self.assertEqual(sorted(f['uuid'] for f in files), self.expected)
+        self.assertTrue(all('file_size' in f for f in files))
+
+        # files without `run` come last
+        self.assertEqual([f['file_size'] % 10 for f in files[-10:]], [0] * 10)
+
+    def test_filtered_ranges(self):
+        files = list(self.client.iter_list_sharded({'run': {'$lt': 3}}, key='run', bounds=[1, 2], page_size=7,
+                                                   keys=['file_size']))
+        self.assertEqual(sorted(f['file_size'] for f in files), [i for i in range(30) if i % 10])
+
+    def test_unique(self):
+        shards = [({}, 0, 10), ({}, 5, 10), ({}, 95, 10)]
+
+        files = list(iter_sharded(self.client, shards, page_size=7))
+        self.assertEqual(len(files), 20)
+
+        files = list(iter_sharded(self.client, shards, page_size=7, unique=False))
+        self.assertEqual(len(files), 25)
+
+    def test_errors_propagate(self):
+        with self.assertRaises(BadRequestError):
+            list(self.client.iter_list_sharded(page_size=8))
+
+    def test_early_close(self):
+        files = self.client.iter_list_sharded(page_size=7, window=7, max_workers=4)
+        next(files)
+        files.close()
+
+        self.assertLess(self.server.catalog.requests['GET'], 15)
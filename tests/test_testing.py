@@ -0,0 +1,123 @@
+import unittest
+
+from wipac_fc.cache import MetadataCache
+from wipac_fc.client import BadRequestError, ConflictError, NotFoundError, PreconditionFailedError, WFCClient
+from wipac_fc.ingest import CREATED, REPLICA
+from wipac_fc.ratelimit import RateController
+from wipac_fc.testing import FakeFileCatalog, FakeServer, matches
+
+
+def make_file(i):
+    return {
+        'uuid': 'uid-{:03d}'.format(i),
+        'logical_name': '/data/file{:03d}.i3'.format(i),
+        'checksum': {'sha512': '{:0128x}'.format(i)},
+        'file_size': i,
+        'locations': [{'site': 'WIPAC', 'path': '/data/file{:03d}.i3'.format(i)}],
+        'run': {'number': i % 3},
+    }
+
+
+class TestMatches(unittest.TestCase):
+    def test_operators(self):
+        f = make_file(5)
+
+        self.assertTrue(matches(f, {}))
+        self.assertTrue(matches(f, {'file_size': 5, 'run.number': 2}))
+        self.assertFalse(matches(f, {'run.number': 1}))
+        self.assertTrue(matches(f, {'file_size': {'$gte': 5, '$lt': 6}}))
+        self.assertFalse(matches(f, {'file_size': {'$gt': 5}}))
+        self.assertTrue(matches(f, {'file_size': {'$in': [1, 5]}}))
+        self.assertTrue(matches(f, {'logical_name': {'$regex': r'file00\d'}}))
+        self.assertTrue(matches(f, {'missing': {'$exists': False}}))
+        self.assertFalse(matches(f, {'missing': {'$gt': 0}}))
+        self.assertTrue(matches(f, {'$or': [{'file_size': 1}, {'file_size': 5}]}))
+        self.assertTrue(matches(f, {'checksum': {'sha512': '{:0128x}'.format(5)}}))
+
+
+class TestFakeServer(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer(FakeFileCatalog(max_limit=10)).start()
+        self.client = WFCClient(self.server.url, self.server.port)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_create_get_delete(self):
+        status, _ = self.client._create(make_file(1))
+        self.assertEqual(status, CREATED)
+
+        # same logical name and checksum at another site
+        f = make_file(1)
+        f['locations'] = [{'site': 'NERSC', 'path': '/tape/file001.i3'}]
+        del f['uuid']
+        status, _ = self.client._create(f)
+        self.assertEqual(status, REPLICA)
+
+        metadata = self.client.get('uid-001')
+        self.assertEqual([l['site'] for l in metadata['locations']], ['WIPAC', 'NERSC'])
+
+        f['checksum'] = {'sha512': 'other'}
+        with self.assertRaises(ConflictError):
+            self.client.create(f)
+
+        with self.assertRaises(BadRequestError):
+            self.client.create({'logical_name': '/data/incomplete.i3'})
+
+        self.client.delete('uid-001')
+        with self.assertRaises(NotFoundError):
+            self.client.get('uid-001')
+
+    def test_update_with_etags(self):
+        self.server.catalog.add(make_file(1))
+
+        self.client.get('uid-001')
+        result = self.client.update('uid-001', {'content_status': 'good'})
+        self.assertEqual(result['content_status'], 'good')
+
+        # another client changes the file, the remembered etag is outdated
+        WFCClient(self.server.url, self.server.port).update('uid-001', {'file_size': 7})
+        self.client.update('uid-001', {'file_size': 8})
+        self.assertEqual(self.server.catalog.files['uid-001']['file_size'], 8)
+
+        with self.assertRaises(PreconditionFailedError):
+            self.client.update('uid-001', {'file_size': 9}, etag='"outdated"')
+
+        with self.assertRaises(BadRequestError):
+            self.client.update('uid-001', {'uuid': 'other'})
+
+    def test_listing(self):
+        for i in range(25):
+            self.server.catalog.add(make_file(i))
+
+        files = list(self.client.iter_list(page_size=10))
+        self.assertEqual([f['uuid'] for f in files], ['uid-{:03d}'.format(i) for i in range(25)])
+        self.assertEqual(sorted(files[0]), ['logical_name', 'uuid'])
+
+        files = list(self.client.iter_list({'run.number': 0}, page_size=10, keys=['uuid', 'file_size'],
+                                           records=True))
+        self.assertEqual([f['file_size'] for f in files], list(range(0, 25, 3)))
+
+        with self.assertRaises(BadRequestError):
+            self.client.get_list(limit=11)
+
+    def test_cache_revalidation(self):
+        self.server.catalog.add(make_file(1))
+        cache = MetadataCache(ttl=0)
+        client = WFCClient(self.server.url, self.server.port, cache=cache)
+
+        client.get('uid-001')
+        client.get('uid-001')
+
+        self.assertEqual(cache.stats()['not_modified'], 1)
+
+    def test_throttling(self):
+        self.server.catalog.add(make_file(1))
+        self.server.throttle = 0.5
+        client = WFCClient(self.server.url, self.server.port,
+                           rate_controller=RateController(backoff=0.001, max_retries=50))
+
+        for _ in range(10):
+            self.assertEqual(client.get('uid-001')['uuid'], 'uid-001')
+
+        self.assertGreater(self.server.catalog.requests['GET'], 10)
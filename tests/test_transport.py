@@ -0,0 +1,74 @@
+import threading
+import unittest
+
+from wipac_fc.client import NotFoundError, WFCClient
+from wipac_fc.transport import Transport
+
+from . import FakeResponse, RecordingTransport
+
+
+class TestClientTransport(unittest.TestCase):
+    def test_all_verbs_use_transport(self):
+        transport = RecordingTransport(FakeResponse(200, {'_embedded': {'files': []}}),
+                                       FakeResponse(200, {'uuid': 'a'}),
+                                       FakeResponse(201, {'file': '/api/files/a'}),
+                                       FakeResponse(200, {'uuid': 'a'}, {'etag': 'e'}),
+                                       FakeResponse(200, {}),
+                                       FakeResponse(200, {'uuid': 'a'}, {'etag': 'e'}),
+                                       FakeResponse(200, {}),
+                                       FakeResponse(204))
+        client = WFCClient('http://localhost', 8888, transport=transport)
+
+        client.get_list()
+        client.get('a')
+        client.create({'uuid': 'a'})
+        client.update('a', {'x': 1})
+        client.replace('a', {'x': 1})
+        client.delete('a')
+
+        self.assertEqual([(m, u) for m, u, _ in transport.requests],
+                         [('GET', 'http://localhost:8888/api/files'),
+                          ('GET', 'http://localhost:8888/api/files/a'),
+                          ('POST', 'http://localhost:8888/api/files'),
+                          ('GET', 'http://localhost:8888/api/files/a'),
+                          ('PATCH', 'http://localhost:8888/api/files/a'),
+                          ('GET', 'http://localhost:8888/api/files/a'),
+                          ('PUT', 'http://localhost:8888/api/files/a'),
+                          ('DELETE', 'http://localhost:8888/api/files/a')])
+        self.assertEqual(transport.requests[4][2]['headers'], {'If-None-Match': 'e'})
+
+    def test_delete_error(self):
+        client = WFCClient('http://localhost', transport=RecordingTransport(FakeResponse(404, {'message': 'not found'})))
+
+        with self.assertRaises(NotFoundError):
+            client.delete('a')
+
+
+class TestTransport(unittest.TestCase):
+    def test_sessions_per_thread_share_pool(self):
+        transport = Transport(pool_maxsize=4)
+        sessions = []
+
+        def run():
+            sessions.append(transport.session)
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(set(id(s) for s in sessions)), 3)
+        self.assertTrue(all(s.get_adapter('http://localhost') is transport._adapter for s in sessions))
+        self.assertEqual(transport._adapter._pool_maxsize, 4)
+
+    def test_defaults(self):
+        transport = Transport(keep_alive=False, timeout=(1, 5))
+        self.assertEqual(transport.session.headers['Connection'], 'close')
+
+        calls = []
+        transport.session.request = lambda method, url, **kwargs: calls.append(kwargs)
+        transport.request('GET', 'http://localhost')
+        transport.request('GET', 'http://localhost', timeout=30)
+
+        self.assertEqual([c['timeout'] for c in calls], [(1, 5), 30])
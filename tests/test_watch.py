@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from wipac_fc.client import ClientError, WFCClient
+from wipac_fc.testing import FakeServer
+
+
+def make_file(i, run=1):
+    return {'uuid': 'uid-%d' % i, 'logical_name': '/data/%d.i3' % i, 'run': run}
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer().start()
+        self.addCleanup(self.server.stop)
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        self.client = WFCClient(self.server.url, self.server.port)
+        self.catalog = self.server.catalog
+
+        for i in range(3):
+            self.catalog.add(make_file(i))
+        self.catalog.add(make_file(3, run=2))
+
+    def uuids(self, files):
+        return sorted(f['uuid'] for f in files)
+
+    def test_poll(self):
+        watcher = self.client.watch({'run': 1})
+
+        self.assertEqual(self.uuids(watcher.poll()), ['uid-0', 'uid-1', 'uid-2'])
+        self.assertEqual(watcher.poll(), [])
+
+        self.catalog.add(make_file(4))
+        self.catalog.update('uid-0', {'checked': True}, None, False)
+        self.catalog.update('uid-3', {'checked': True}, None, False)
+
+        self.assertEqual(self.uuids(watcher.poll()), ['uid-0', 'uid-4'])
+        self.assertEqual(watcher.poll(), [])
+
+    def test_boundary(self):
+        watcher = self.client.watch({'run': 1})
+        watcher.poll()
+
+        # a change within the same timestamp as the cursor
+        f = make_file(5)
+        f['meta_modify_date'] = watcher.cursor
+        self.catalog.files['uid-5'] = f
+        self.catalog.etags['uid-5'] = '"x"'
+
+        self.assertEqual(self.uuids(watcher.poll()), ['uid-5'])
+        self.assertEqual(watcher.poll(), [])
+
+    def test_state(self):
+        state = os.path.join(self.tmpdir, 'watch.json')
+
+        self.assertEqual(len(self.client.watch({'run': 1}, state=state).poll()), 3)
+
+        self.catalog.add(make_file(4))
+        self.assertEqual(self.uuids(self.client.watch({'run': 1}, state=state).poll()), ['uid-4'])
+
+        with self.assertRaises(ClientError):
+            self.client.watch({'run': 2}, state=state)
+
+    def test_since(self):
+        cursor = self.catalog.files['uid-2']['meta_modify_date']
+        watcher = self.client.watch({}, since=cursor)
+
+        self.assertEqual(self.uuids(watcher.poll()), ['uid-2', 'uid-3'])
+
+    def test_run(self):
+        watcher = self.client.watch({'run': 1}, interval=0.01, keys=['logical_name', 'run'])
+        received = []
+        done = threading.Event()
+
+        def callback(f):
+            received.append(f)
+            if len(received) == 4:
+                watcher.stop()
+                done.set()
+
+        thread = threading.Thread(target=watcher.run, args=(callback,))
+        thread.start()
+
+        self.catalog.add(make_file(4))
+        thread.join(5)
+
+        self.assertTrue(done.is_set())
+        self.assertEqual(self.uuids(received), ['uid-0', 'uid-1', 'uid-2', 'uid-4'])
+        self.assertEqual(received[0]['run'], 1)
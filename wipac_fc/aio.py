@@ -0,0 +1,158 @@
+"""
+asyncio client for the file catalog, based on `aiohttp`.
+
+Requires Python 3.5+ and `aiohttp` (`pip install wipac_fc[async]`).
+"""
+
+import json
+import os
+
+import aiohttp
+import requests
+
+from .client import ClientError, Error, error_factory, _api_url, _files_payload, _list_payload
+
+
+class AsyncWFCClient(object):
+    def __init__(self, url, port=None, limit=100, limit_per_host=0, timeout=None):
+        """
+        Initializes the client.
+
+        The url is built like in `WFCClient`. All requests share one `aiohttp.ClientSession`
+        that is created on first use and bound to the running event loop. `limit` caps the
+        number of pooled connections (`limit_per_host` per host, `0` means no extra cap),
+        `timeout` is the total timeout of a request in seconds.
+        """
+        self._url = _api_url(url, port)
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._timeout = timeout
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """
+        Closes the pooled connections.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._limit, limit_per_host=self._limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self._timeout))
+
+        return self._session
+
+    async def _request(self, method, path, **kwargs):
+        """
+        Sends a request and returns the status code, the headers and the body of the response.
+        """
+        url = os.path.join(self._url, *path)
+
+        async with self._get_session().request(method, url, **kwargs) as r:
+            return r.status, r.headers, await r.text()
+
+    async def get_files(self, run_number=None, dataset=None, event_id=None,
+                        processing_level=None, season=None, keys=None):
+        """
+        Queries files from the file catalog.
+        """
+        payload = _files_payload(run_number, dataset, event_id, processing_level, season, keys)
+
+        status, _, text = await self._request('GET', ['files'], params=payload)
+
+        if status == requests.codes.OK:
+            return json.loads(text)['files']
+        else:
+            raise error_factory(status, text)
+
+    async def get_list(self, query={}, start=None, limit=None, keys=None):
+        """
+        Queries the file list from the file catalog.
+        """
+        payload = _list_payload(query, start, limit, keys)
+
+        status, _, text = await self._request('GET', ['files'], params=payload)
+
+        if status == requests.codes.OK:
+            return json.loads(text)
+        else:
+            raise error_factory(status, text)
+
+    async def get(self, uid):
+        """
+        Queries meta information for a specific file uid.
+        """
+        status, _, text = await self._request('GET', ['files', uid])
+
+        if status == requests.codes.OK:
+            return json.loads(text)
+        else:
+            raise error_factory(status, text)
+
+    async def get_etag(self, uid):
+        """
+        Queries the etag of a specific file uid.
+        """
+        status, headers, _ = await self._request('GET', ['files', uid])
+
+        if status == requests.codes.OK and 'etag' in headers:
+            return headers['etag']
+        else:
+            raise Error('The server responded without an etag', -1)
+
+    async def create(self, metadata):
+        """
+        Tries to create a file in the file catalog.
+
+        See `WFCClient.create()`.
+        """
+        status, _, text = await self._request('POST', ['files'], data=json.dumps(metadata))
+
+        if status in (requests.codes.CREATED, requests.codes.OK):
+            return json.loads(text)
+        else:
+            raise error_factory(status, text)
+
+    async def update(self, uid, metadata={}):
+        """
+        Updates/patches a metadata of a file.
+        """
+        return await self._update_or_replace(uid, metadata, 'PATCH')
+
+    async def replace(self, uid, metadata={}):
+        """
+        Replaces the metadata of a file except for `mongo_id` and `uid`.
+        """
+        return await self._update_or_replace(uid, metadata, 'PUT')
+
+    async def _update_or_replace(self, uid, metadata, method):
+        if not metadata:
+            raise ClientError('No metadata has been passed to update file metadata')
+
+        etag = await self.get_etag(uid)
+        status, _, text = await self._request(method, ['files', uid],
+                                              data=json.dumps(metadata),
+                                              headers={'If-None-Match': etag})
+
+        if status == requests.codes.OK:
+            return json.loads(text)
+        else:
+            raise error_factory(status, text)
+
+    async def delete(self, uid):
+        """
+        Deletes the metadata of a file.
+        """
+        status, _, text = await self._request('DELETE', ['files', uid])
+
+        if status != requests.codes.NO_CONTENT:
+            raise error_factory(status, text)
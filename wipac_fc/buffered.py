@@ -0,0 +1,180 @@
+"""
+Write-behind buffering of metadata updates.
+"""
+
+import threading
+import time
+
+from collections import OrderedDict
+
+from .client import ClientError, _bounded_map
+
+
+class BufferedUpdater(object):
+    """
+    Collects `update()` patches per file and sends them to the catalog in the background.
+
+    Patches of the same uid are merged, later keys replacing earlier ones as consecutive
+    PATCH requests would, so a file that is patched many times is sent one request per
+    flush. The pending patches are flushed when `max_pending` files have patches or the
+    oldest patch is `max_delay` seconds old, with up to `max_workers` requests in flight.
+    Patches are sent through `client.update()` with `etag`, see there.
+
+    While a flush is being sent, further patches are collected; once `2 * max_pending`
+    files have patches waiting, `update()` blocks until the flush is done.
+
+    Failed patches are not retried. Their errors are recorded in `errors` by uid until
+    a later patch of the file succeeds, and passed to `on_error(uid, metadata, error)`
+    if given.
+
+    Use it as context manager, or call `close()`, to send the remaining patches.
+    """
+
+    def __init__(self, client, max_pending=1000, max_delay=5.0, max_workers=8, etag=None, on_error=None):
+        if max_pending < 1 or max_workers < 1:
+            raise ClientError('Arguments `max_pending` and `max_workers` must be positive.')
+
+        self._client = client
+        self._max_pending = max_pending
+        self._max_delay = max_delay
+        self._max_workers = max_workers
+        self._etag = etag
+        self._on_error = on_error
+
+        self.errors = {}
+        self.sent = 0
+
+        self._pending = OrderedDict()
+        self._oldest = None
+        self._closed = False
+        self._requested = False
+
+        # sequence numbers of the last queued and the last sent patch
+        self._queued = 0
+        self._done = 0
+
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending)
+
+    def update(self, uid, metadata):
+        """
+        Queues a patch of the metadata of the file `uid`.
+        """
+        if not metadata:
+            raise ClientError('No metadata has been passed to update file metadata')
+
+        with self._cond:
+            if self._closed:
+                raise ClientError('The updater has been closed.')
+
+            # backpressure, except for `on_error` calls of the background thread
+            while (len(self._pending) >= 2 * self._max_pending and uid not in self._pending
+                   and threading.current_thread() is not self._thread):
+                self._cond.wait()
+
+                if self._closed:
+                    raise ClientError('The updater has been closed.')
+
+            patch = self._pending.get(uid)
+            if patch is None:
+                self._pending[uid] = dict(metadata)
+            else:
+                patch.update(metadata)
+
+            self._queued += 1
+
+            if self._oldest is None:
+                # let the background thread time the first patch
+                self._oldest = time.time()
+                self._cond.notify_all()
+            elif len(self._pending) >= self._max_pending:
+                self._cond.notify_all()
+
+    def flush(self):
+        """
+        Sends all patches queued so far and waits until they are done.
+        """
+        with self._cond:
+            target = self._queued
+            self._requested = True
+            self._cond.notify_all()
+
+            while self._done < target:
+                self._cond.wait()
+
+    def close(self):
+        """
+        Sends the remaining patches and stops the background thread.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._pending:
+                        return
+
+                    if self._pending:
+                        wait = self._oldest + self._max_delay - time.time()
+                        if (self._closed or self._requested or wait <= 0
+                                or len(self._pending) >= self._max_pending):
+                            break
+                    else:
+                        wait = None
+                        # nothing is left to be sent
+                        self._requested = False
+
+                    self._cond.wait(wait)
+
+                batch = self._pending
+                sequence = self._queued
+                self._pending = OrderedDict()
+                self._oldest = None
+                self._requested = False
+
+                # wakes up blocked `update()` calls
+                self._cond.notify_all()
+
+            self._send(batch)
+
+            with self._cond:
+                self._done = sequence
+                self._cond.notify_all()
+
+    def _send(self, batch):
+        def update(item):
+            return self._client.update(item[0], item[1], etag=self._etag)
+
+        for (uid, metadata), future in _bounded_map(update, batch.items(), self._max_workers, ordered=False):
+            error = future.exception()
+
+            if error is None:
+                self.sent += 1
+                self.errors.pop(uid, None)
+                continue
+
+            self.errors[uid] = error
+
+            if self._on_error is not None:
+                try:
+                    self._on_error(uid, metadata, error)
+                except Exception:
+                    # must not stop the background thread, or flush() would wait forever
+                    pass
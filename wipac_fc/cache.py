@@ -0,0 +1,130 @@
+"""
+Bounded in-memory caches used by the client.
+"""
+
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class LRUDict(object):
+    """
+    A thread-safe mapping that holds at most `maxsize` entries.
+
+    When it is full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+
+            # re-insert to mark as most recently used
+            self._data[key] = value
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MetadataCache(object):
+    """
+    Cache for the metadata returned by `WFCClient.get()`.
+
+    At most `maxsize` files are cached; the least recently used are evicted first.
+    Entries are fresh for `ttl` seconds. After that, the client revalidates them with
+    their etag, so an unchanged file only costs a `304 Not Modified` without a body.
+
+    The counters `hits`, `misses`, `revalidations` and `not_modified` are available
+    as attributes and via `stats()`.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.ttl = ttl
+        self._entries = LRUDict(maxsize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.not_modified = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def lookup(self, uid):
+        """
+        Returns `(metadata, etag, fresh)` for a cached `uid` or `None`.
+
+        Stale entries without an etag cannot be revalidated and are treated as missing.
+        """
+        entry = self._entries.get(uid)
+
+        if entry is not None:
+            metadata, etag, expires = entry
+            if time.time() < expires:
+                self._count('hits')
+                return metadata, etag, True
+            elif etag is not None:
+                self._count('revalidations')
+                return metadata, etag, False
+
+        self._count('misses')
+        return None
+
+    def store(self, uid, metadata, etag=None):
+        self._entries[uid] = (metadata, etag, time.time() + self.ttl)
+
+    def refresh(self, uid):
+        """
+        Marks a revalidated entry as fresh again.
+        """
+        self._count('not_modified')
+
+        entry = self._entries.get(uid)
+        if entry is not None:
+            self.store(uid, entry[0], entry[1])
+
+    def invalidate(self, uid):
+        self._entries.pop(uid)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'not_modified': self.not_modified,
+            }
@@ -1,7 +1,18 @@
 import requests
+import copy
+import functools
 import json
+import multiprocessing
 import os
 
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from . import decoder, ingest, record
+from .cache import LRUDict
+from .coalesce import SingleFlight
+from .transport import Transport
+
 
 class ClientError(Exception):
     """
@@ -60,6 +71,11 @@ class NotFoundError(Error):
         super(NotFoundError, self).__init__(message, 404, *args)
 
 
+class PreconditionFailedError(Error):
+    def __init__(self, message, *args):
+        super(PreconditionFailedError, self).__init__(message, 412, *args)
+
+
 def error_factory(code, message):
     """
     Tries to find the correct `Error` class. If no class is found that corresponds to the `code`,
@@ -77,109 +93,606 @@ def error_factory(code, message):
         return Error(message, code)
 
 
+def _api_url(url, port=None):
+    """
+    Builds the base api url, e.g. `https://example.com:8080/api`.
+    """
+    if port is not None:
+        url = url + ':' + str(port)
+
+    # add base api path:
+    return os.path.join(url, 'api')
+
+
+def _files_payload(run_number=None, dataset=None, event_id=None,
+                   processing_level=None, season=None, keys=None):
+    """
+    Builds the query parameters of `get_files()`.
+    """
+    payload = {}
+
+    if run_number is not None:
+        payload['run_number'] = int(run_number)
+
+    if dataset is not None:
+        payload['dataset'] = int(dataset)
+
+    if event_id is not None:
+        payload['event_id'] = int(event_id)
+
+    if processing_level is not None:
+        payload['processing_level'] = processing_level
+
+    if season is not None:
+        payload['season'] = int(season)
+
+    if keys is not None:
+        payload['keys'] = '|'.join(keys)
+
+    return payload
+
+
+def _list_payload(query={}, start=None, limit=None, keys=None):
+    """
+    Builds the query parameters of `get_list()`.
+    """
+    payload = {}
+
+    if keys is not None:
+        payload['keys'] = '|'.join(keys)
+
+    if start is not None:
+        payload['start'] = int(start)
+
+    if limit is not None:
+        payload['limit'] = int(limit)
+
+    if not isinstance(query, dict):
+        raise ClientError('Argument `query` must be a dict.')
+
+    if query:
+        payload['query'] = json.dumps(query)
+
+    return payload
+
+
+def _bounded_map(fn, items, max_workers, ordered=True, executor_class=ThreadPoolExecutor, join=False):
+    """
+    Calls `fn` for each of `items` on a thread pool and yields `(item, future)` pairs.
+
+    `items` is consumed lazily; at most `2 * max_workers` calls are in flight or waiting
+    to be yielded at any time. If `ordered` is set, the pairs are yielded in the order of
+    `items`, otherwise as soon as the calls complete. Pass `ProcessPoolExecutor` as
+    `executor_class` to use processes instead.
+
+    If the generator is closed early, calls that have not started are cancelled; with
+    `join`, it waits for the running ones to finish.
+    """
+    if max_workers < 1:
+        raise ClientError('Argument `max_workers` must be positive.')
+
+    items = iter(items)
+    window = 2 * max_workers
+    executor = executor_class(max_workers=max_workers)
+    pending = deque() if ordered else {}
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                future = executor.submit(fn, item)
+                if ordered:
+                    pending.append((item, future))
+                else:
+                    pending[future] = item
+
+            if not pending:
+                return
+
+            if ordered:
+                item, future = pending.popleft()
+                wait([future])
+                yield item, future
+            else:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future
+    finally:
+        for future in (f for _, f in pending) if ordered else pending:
+            future.cancel()
+
+        executor.shutdown(wait=join)
+
+
+def _complete_keys(client, files, keys):
+    """
+    Adds the `keys` missing in the listed `files` with `client`, unless its server
+    supports projections and the fields are simply not set. Returns `files`.
+    """
+    if keys is not None and any(k not in f for f in files for k in keys) and not client._projects():
+        client._fill_keys(files, keys)
+
+    return files
+
+
+def _with_uuid(keys):
+    """
+    Returns the listing `keys` with `uuid`, which identifies the files to fill in.
+    """
+    if keys is None or 'uuid' in keys:
+        return keys
+
+    return ['uuid'] + list(keys)
+
+
+class _PathCheckpoint(object):
+    """
+    Lets `create_many()` add the files it creates to a checkpoint keyed by
+    `ingest.file_key()`. The files in that checkpoint are skipped before they are hashed.
+    """
+
+    def __init__(self, checkpoint):
+        self._checkpoint = checkpoint
+
+    def __contains__(self, metadata):
+        return False
+
+    def add(self, metadata):
+        try:
+            self._checkpoint.add(metadata['locations'][0]['path'])
+        except EnvironmentError:
+            # the file is gone, it is hashed again if it shows up
+            pass
+
+
 class WFCClient:
-    def __init__(self, url, port=None, use_session=False):
+    def __init__(self, url, port=None, use_session=True, transport=None,
+                 pool_maxsize=10, timeout=None, etag_cache_size=10000, cache=None,
+                 rate_controller=None, json_backend=None, metrics=None, coalesce=False):
         """
         Initializes the client.
 
         If a port is specified, it is added to the `url`, e.g. `https://example.com:8080`.
+
+        All requests go through a `Transport` that pools up to `pool_maxsize` connections
+        per host and may be shared by several threads and clients. `timeout` is either a
+        number of seconds or a `(connect, read)` tuple. With `use_session=False` connections
+        are closed after every request. An existing `transport` can be passed instead.
+
+        The etags of the last `etag_cache_size` files seen in responses are remembered
+        and used by `update()` and `replace()`.
+
+        Pass a `wipac_fc.cache.MetadataCache` as `cache` to cache the results of `get()`.
+
+        With a `wipac_fc.ratelimit.RateController`, all requests are sent within its adaptive
+        concurrency limit and throttled requests are retried with backoff. Share one
+        controller between clients that talk to the same server.
+
+        Responses are decoded with `json_backend`, see `wipac_fc.decoder.get_decoder()`;
+        by default the fastest installed json library is used, except for streamed listings,
+        which the standard library decodes fastest.
+
+        Pass a `wipac_fc.metrics.Metrics` as `metrics` to record every request.
+
+        With `coalesce=True`, identical concurrent calls of `get()` and `get_list()` are
+        sent to the server only once; all callers get a copy of the one response, or its
+        error. A `wipac_fc.coalesce.SingleFlight` can be passed to share it between clients.
         """
-        self._url = url
+        self._url = _api_url(url, port)
 
-        if port is not None:
-            self._url = self._url + ':' + str(port)
+        if transport is None:
+            transport = Transport(pool_maxsize=pool_maxsize, keep_alive=use_session, timeout=timeout)
 
-        # add base api path:
-        self._url = os.path.join(self._url, 'api')
+        self._transport = transport
+        self._etags = LRUDict(etag_cache_size)
+        self._cache = cache
+        self._rate_controller = rate_controller
+        self._loads = decoder.get_decoder(json_backend)
 
-        # use session?
-        if use_session:
-            self._r = requests.Session()
-        else:
-            self._r = requests
+        # The scanner of the standard library decodes streamed files where it finds them,
+        # which beats finding their end first for another library, unless one is chosen
+        self._stream_loads = json.loads if json_backend is None else self._loads
+        self._metrics = metrics
+
+        # Whether the server returns the `keys` requested in listings, probed when needed
+        self._projection = None
+
+        if coalesce is True:
+            coalesce = SingleFlight()
+
+        self._flight = coalesce or None
+
+    def _request(self, method, path, **kwargs):
+        """
+        Sends a request to the api url joined with the components in `path`.
+        """
+        url = os.path.join(self._url, *path)
+        metrics = self._metrics
+
+        def send():
+            return self._transport.request(method, url, **kwargs)
+
+        on_retry = None
+
+        if metrics is not None:
+            endpoint = '/'.join(path[:1] + ['<uid>'] * (len(path) - 1))
+            unmeasured = send
+
+            def send():
+                return metrics.measure(method, endpoint, url, kwargs, unmeasured)
+
+            def on_retry():
+                metrics.retry(method, endpoint)
+
+        if self._rate_controller is None:
+            return send()
+
+        return self._rate_controller.call(send, on_retry=on_retry)
 
     def get_files(self, run_number=None, dataset=None, event_id=None,
                   processing_level=None, season=None, keys=None):
         """
         Queries files from the file catalog.
         """
-        payload = {}
+        payload = _files_payload(run_number, dataset, event_id, processing_level, season, keys)
+
+        r = self._request('GET', ['files'], params=payload)
 
-        if run_number is not None:
-            payload['run_number'] = int(run_number)
+        if r.status_code == requests.codes.OK:
+            rdict = self._loads(r.content)
 
-        if dataset is not None:
-            payload['dataset'] = int(dataset)
+            return rdict['files']
+        else:
+            raise error_factory(r.status_code, r.text)
 
-        if event_id is not None:
-            payload['event_id'] = int(event_id)
+    def get_list(self, query={}, start=None, limit=None, keys=None):
+        """
+        Queries the file list from the file catalog.
 
-        if processing_level is not None:
-            payload['processing_level'] = processing_level
+        If `keys` is given, the server is asked to return these fields of every file
+        in the list instead of only `uuid` and `logical_name`.
+        """
+        if self._flight is None:
+            return self._get_list(query, start, limit, keys)
 
-        if season is not None:
-            payload['season'] = int(season)
+        key = (self._url, 'list', json.dumps(query, sort_keys=True), start, limit,
+               None if keys is None else tuple(keys))
+        return self._flight.do(key, functools.partial(self._get_list, query, start, limit, keys))
 
-        if keys is not None:
-            payload['keys'] = '|'.join(keys)
+    def _get_list(self, query, start, limit, keys):
+        payload = _list_payload(query, start, limit, keys)
 
-        r = self._r.get(os.path.join(self._url, 'files'), params=payload)
+        r = self._request('GET', ['files'], params=payload)
 
         if r.status_code == requests.codes.OK:
-            rdict = r.json()
+            rdict = self._loads(r.content)
 
-            return rdict['files']
+            return rdict
         else:
             raise error_factory(r.status_code, r.text)
 
-    def get_list(self, query={}, start=None, limit=None):
+    def iter_list(self, query={}, page_size=1000, prefetch=1, keys=None, stream=False, records=False):
         """
-        Queries the file list from the file catalog.
+        Iterates over all files matching `query` by walking the pages of `get_list()`.
+
+        While the current page is consumed, up to `prefetch` following pages are
+        requested in the background. Use `prefetch=0` to fetch pages strictly one
+        after another. At most `prefetch + 1` pages are held in memory.
+
+        If `keys` is given, the listed files contain these fields and `uuid`. Should the
+        server not support `keys`, which is probed once per client, the missing fields are
+        filled in by fetching the metadata of the files of a page concurrently.
+
+        With `stream=True`, the files of a page are decoded and yielded while the page
+        arrives, instead of after it has been read and decoded as a whole. This keeps the
+        memory use independent of `page_size`. Prefetched pages are then requested in the
+        background, but read only when they are consumed.
 
-        This method caches the uid/mongo_id mapping in order to be able
-        querying files by uid faster.
+        With `records=True`, the files are yielded as `wipac_fc.record.FileRecord`s, which
+        need less memory than dicts and decode nested fields only when they are accessed.
+        This implies `stream=True`.
+
+        *Note*: `page_size` must not exceed the server's maximum list limit, since a
+        short page is taken as the end of the listing.
         """
-        payload = {}
+        if not isinstance(query, dict):
+            raise ClientError('Argument `query` must be a dict.')
+
+        if page_size < 1:
+            raise ClientError('Argument `page_size` must be positive.')
+
+        if prefetch < 0:
+            raise ClientError('Argument `prefetch` must not be negative.')
+
+        stream = stream or records
+        keys = _with_uuid(keys)
+
+        # streamed files are decoded one by one
+        loads = functools.partial(record.FileRecord.from_json, loads=self._loads) if records else self._stream_loads
+
+        def fill(files):
+            return _complete_keys(self, files, keys)
+
+        def fetch(start):
+            if not stream:
+                return fill(self.get_list(query=query, start=start, limit=page_size, keys=keys)['_embedded']['files'])
+
+            r = self._request('GET', ['files'], params=_list_payload(query, start, page_size, keys), stream=True)
+
+            if r.status_code != requests.codes.OK:
+                raise error_factory(r.status_code, r.text)
+
+            return r
+
+        def close(future):
+            if stream and not future.cancelled() and future.exception() is None:
+                future.result().close()
 
-        if start is not None:
-            payload['start'] = int(start)
+        def pages():
+            if not prefetch:
+                start = 0
+                while True:
+                    yield fetch(start)
+                    start += page_size
 
-        if limit is not None:
-            payload['limit'] = int(limit)
+            executor = ThreadPoolExecutor(max_workers=prefetch + 1)
+            pending = deque()
+            next_start = 0
+
+            try:
+                while True:
+                    while len(pending) <= prefetch:
+                        pending.append(executor.submit(fetch, next_start))
+                        next_start += page_size
+
+                    yield pending.popleft().result()
+            finally:
+                # Pages requested beyond the end of the listing are dropped
+                for future in pending:
+                    if not future.cancel():
+                        future.add_done_callback(close)
+
+                executor.shutdown(wait=False)
+
+        page_iter = pages()
+
+        try:
+            for page in page_iter:
+                files = self._iter_streamed(page, fill, loads) if stream else iter(page)
+                count = 0
+
+                try:
+                    for f in files:
+                        count += 1
+                        yield f
+                finally:
+                    if stream:
+                        files.close()
+
+                if count < page_size:
+                    return
+        finally:
+            page_iter.close()
+
+    def iter_list_sharded(self, query={}, key=None, bounds=None, window=None, page_size=1000,
+                          max_workers=4, ordered=False, unique=True, keys=None):
+        """
+        Iterates over all files matching `query` by listing disjoint shards of it concurrently.
+
+        With `key` and `bounds`, the query is split by value ranges of `key`, see
+        `wipac_fc.sharding.range_queries()`; e.g. `key='offline_processing_metadata.run_id'`
+        and `bounds=range(120000, 130000, 500)`. Otherwise it is split into offset windows
+        of `window` files (by default ten pages), which are started until one comes up short.
+
+        Up to `max_workers` shards are paged through at the same time, each with at most
+        two pages buffered. With `ordered=True`, the files of a shard are yielded before those
+        of the next one, in the order of the windows or ranges; otherwise as they arrive.
+        With `unique=True`, files are de-duplicated by `uuid`, which keeps the uuids of all
+        yielded files in memory. Offset windows may repeat or miss files if the catalog
+        changes while it is listed; ranges do not.
+        """
+        from . import sharding
 
         if not isinstance(query, dict):
             raise ClientError('Argument `query` must be a dict.')
 
-        if query:
-            payload['query'] = json.dumps(query)
+        if page_size < 1 or max_workers < 1:
+            raise ClientError('Arguments `page_size` and `max_workers` must be positive.')
 
-        r = self._r.get(os.path.join(self._url, 'files'), params=payload)
+        if window is not None and window < 1:
+            raise ClientError('Argument `window` must be positive.')
 
-        if r.status_code == requests.codes.OK:
-            rdict = r.json()
+        if key is not None:
+            if bounds is None:
+                raise ClientError('Argument `bounds` is required with `key`.')
 
-            return rdict
+            shards = [(q, 0, None) for q in sharding.range_queries(query, key, bounds)]
         else:
-            raise error_factory(r.status_code, r.text)
+            shards = sharding.offset_shards(query, window or 10 * page_size)
+
+        return sharding.iter_sharded(self, shards, page_size=page_size, max_workers=max_workers,
+                                     ordered=ordered, unique=unique, keys=keys)
+
+    def _iter_streamed(self, r, fill, loads, batch_size=100):
+        """
+        Decodes the files of the streamed list response `r` with `loads` while it arrives.
+        If `fill` has to add missing keys, the files are passed to it in batches.
+        """
+        try:
+            batch = []
+            for f in decoder.iter_array(r.iter_content(chunk_size=65536), ('_embedded', 'files'), loads):
+                batch.append(f)
+
+                if len(batch) >= batch_size:
+                    for f in fill(batch):
+                        yield f
+
+                    batch = []
+
+            for f in fill(batch):
+                yield f
+        finally:
+            r.close()
+
+    def get_columns(self, fields, query={}, page_size=1000, prefetch=1, keys=None):
+        """
+        Lists the files matching `query` into typed columns of the selected `fields`.
+
+        Returns a `wipac_fc.columnar.Columns`, see there for `fields` and the aggregations.
+        Only the columns are kept in memory, not the listed files. `keys` are the fields
+        requested from the server; by default they are derived from `fields`, which needs
+        `keys` to be given for columns extracted by a callable.
+        """
+        from .columnar import Columns
+
+        columns = Columns(fields)
+
+        if keys is None:
+            derived = sorted(name for name, spec in fields.items()
+                             if isinstance(spec, tuple) and callable(spec[1]))
+            if derived:
+                raise ClientError('Argument `keys` is required for the columns {} extracted by a '
+                                  'callable.'.format(', '.join('`{}`'.format(name) for name in derived)))
+
+            keys = ['uuid'] + [k for k in columns.keys() if k != 'uuid']
+
+        for f in self.iter_list(query, page_size=page_size, prefetch=prefetch, keys=keys):
+            columns.append(f)
+
+        return columns
+
+    def watch(self, query={}, interval=60, **kwargs):
+        """
+        Returns a `wipac_fc.watch.Watcher` of the files matching `query` that are created
+        or modified, polled every `interval` seconds. See there for the other arguments.
+        """
+        from .watch import Watcher
+
+        return Watcher(self, query, interval=interval, **kwargs)
+
+    def _projects(self):
+        """
+        Returns whether the server returns only the requested keys in listings, which is
+        probed once by listing one file with `keys=['uuid']`: servers that ignore `keys`
+        return its `logical_name` too.
+        """
+        if self._projection is None:
+            files = self.get_list(start=0, limit=1, keys=['uuid'])['_embedded']['files']
+
+            if files:
+                self._projection = 'logical_name' not in files[0]
+            else:
+                # an empty catalog has nothing to fill in
+                return False
+
+        return self._projection
+
+    def _fill_keys(self, files, keys):
+        """
+        Adds the `keys` missing in the listed `files` from their full metadata.
+        """
+        incomplete = dict((f['uuid'], f) for f in files if any(k not in f for k in keys))
+
+        for uid, metadata, error in self.get_many(list(incomplete), ordered=False):
+            if isinstance(error, NotFoundError):
+                # deleted since it has been listed
+                continue
+            elif error is not None:
+                raise error
+
+            f = incomplete[uid]
+            for k in keys:
+                if k in metadata:
+                    f[k] = metadata[k]
 
     def get(self, uid):
         """
         Queries meta information for a specific file uid.
+
+        If the client has a cache, fresh entries are returned without a request and
+        stale ones are revalidated with their etag.
         """
-        r = self._r.get(os.path.join(self._url, 'files', uid))
+        if self._flight is None:
+            return self._get(uid)
 
-        if r.status_code == requests.codes.OK:
-            return r.json()
+        return self._flight.do((self._url, 'get', uid), functools.partial(self._get, uid))
+
+    def _get(self, uid):
+        cached = None
+        kwargs = {}
+
+        if self._cache is not None:
+            cached = self._cache.lookup(uid)
+            if cached is not None:
+                if cached[2]:
+                    return copy.deepcopy(cached[0])
+
+                kwargs['headers'] = {'If-None-Match': cached[1]}
+
+        r = self._request('GET', ['files', uid], **kwargs)
+
+        if r.status_code == requests.codes.NOT_MODIFIED and cached is not None:
+            self._cache.refresh(uid)
+            return copy.deepcopy(cached[0])
+        elif r.status_code == requests.codes.OK:
+            self._remember_etag(uid, r)
+            metadata = self._loads(r.content)
+
+            if self._cache is not None:
+                self._cache.store(uid, copy.deepcopy(metadata), r.headers.get('etag'))
+
+            return metadata
         else:
+            if self._cache is not None:
+                self._cache.invalidate(uid)
+
             raise error_factory(r.status_code, r.text)
 
+    def _remember_etag(self, uid, r):
+        """
+        Remembers the etag of the response `r` for `uid`, or forgets the known one
+        if the response has none.
+        """
+        if 'etag' in r.headers:
+            self._etags[uid] = r.headers['etag']
+        else:
+            self._etags.pop(uid)
+
+    def get_many(self, uids, max_workers=8, ordered=True):
+        """
+        Queries meta information for many file uids concurrently.
+
+        Yields a `(uid, metadata, error)` tuple per uid. If the server responds with an
+        error for a uid, `metadata` is `None` and `error` holds the `Error` instance
+        created by `error_factory()`; the remaining uids are still fetched.
+
+        `uids` is consumed lazily and at most `max_workers` requests are in flight.
+        With `ordered=False`, results are yielded as soon as they arrive.
+        """
+        for uid, future in _bounded_map(self.get, uids, max_workers, ordered):
+            error = future.exception()
+
+            if error is None:
+                yield uid, future.result(), None
+            elif isinstance(error, Error):
+                yield uid, None, error
+            else:
+                raise error
+
     def get_etag(self, uid):
         """
         Queries meta information for a specific file uid.
         """
-        r = self._r.get(os.path.join(self._url, 'files', uid))
+        r = self._request('GET', ['files', uid])
 
         if r.status_code == requests.codes.OK and 'etag' in r.headers:
+            self._etags[uid] = r.headers['etag']
             return r.headers['etag']
         else:
             raise Error('The server responded without an etag', -1)
@@ -192,25 +705,197 @@ class WFCClient:
 
         *Note*: The client does not check the metadata. Checks are entirely done by the server.
         """
-        r = self._r.post(os.path.join(self._url, 'files'), json.dumps(metadata))
+        return self._create(metadata)[1]
+
+    def _create(self, metadata):
+        """
+        Creates a file and returns `(status, response)`, where `status` is
+        `ingest.CREATED` or `ingest.REPLICA`.
+        """
+        r = self._request('POST', ['files'], data=json.dumps(metadata))
 
         if r.status_code == requests.codes.CREATED:
-            # Add uid/mongo_id to cache
-            rdict = r.json()
-            return rdict
+            rdict = self._loads(r.content)
+            self._remember_created_etag(metadata, rdict, r)
+            return ingest.CREATED, rdict
         elif r.status_code == requests.codes.OK:
             # Replica added
-            return r.json()
+            rdict = self._loads(r.content)
+            self._remember_created_etag(metadata, rdict, r)
+            return ingest.REPLICA, rdict
         else:
             raise error_factory(r.status_code, r.text)
 
-    def update(self, uid, metadata={}):
+    def create_many(self, metadata, max_workers=8, ordered=False, checkpoint=None, dedup=None):
+        """
+        Creates many files concurrently.
+
+        `metadata` may be any iterable, e.g. a generator. It is consumed lazily, so that
+        at most `max_workers` creates are in flight and only a few records are buffered.
+
+        Yields an `ingest.CreateResult` per record. Its `status` tells apart files that
+        have been `CREATED`, replicas that have been added (`REPLICA`), `CONFLICT`s and
+        other errors of the server (`FAILED`); errors are not raised.
+
+        `checkpoint` is an `ingest.Checkpoint` or the path of its file. Records that have
+        been created or added as replica are stored in it, and records already stored are
+        not posted again but reported as `SKIPPED`. That way an interrupted ingest can
+        simply be restarted with the same checkpoint.
+
+        `dedup` is a `wipac_fc.dedup.DuplicateIndex` of the files known to the catalog.
+        Records it knows with all their locations are not posted but reported as
+        `DUPLICATE`, records whose logical name it knows with another checksum for a common
+        algorithm as `CONFLICT`. Created files are added to it.
+        """
+        own_checkpoint = (checkpoint is not None
+                          and not isinstance(checkpoint, (ingest.Checkpoint, _PathCheckpoint)))
+        if own_checkpoint:
+            checkpoint = ingest.Checkpoint(checkpoint)
+
+        def create(m):
+            if checkpoint is not None and m in checkpoint:
+                return ingest.SKIPPED, None
+
+            if dedup is not None:
+                known = dedup.check(m)
+                if known == ingest.DUPLICATE:
+                    return ingest.DUPLICATE, None
+                elif known == ingest.CONFLICT:
+                    raise ConflictError('conflict with existing file (logical_name with another checksum '
+                                        'known to the duplicate index)')
+
+            status, result = self._create(m)
+
+            # recorded right away, so that records not yet yielded are not posted again
+            if checkpoint is not None:
+                checkpoint.add(m)
+
+            if dedup is not None:
+                dedup.add(m)
+
+            return status, result
+
+        try:
+            # running creates are waited for on close, so that they reach the checkpoint
+            for m, future in _bounded_map(create, metadata, max_workers, ordered, join=True):
+                error = future.exception()
+
+                if error is None:
+                    status, result = future.result()
+                    yield ingest.CreateResult(m, status, result, None)
+                elif isinstance(error, ConflictError):
+                    yield ingest.CreateResult(m, ingest.CONFLICT, None, error)
+                elif isinstance(error, Error):
+                    yield ingest.CreateResult(m, ingest.FAILED, None, error)
+                else:
+                    raise error
+        finally:
+            if own_checkpoint:
+                checkpoint.close()
+
+    def register_files(self, paths, site, logical_name=None, processes=None, max_workers=8,
+                       checkpoint=None, dedup=None, algorithm='sha512'):
+        """
+        Checksums local files and creates them in the file catalog.
+
+        `paths` may be any iterable and is consumed lazily. The files are hashed by
+        `ingest.file_metadata()` in a pool of `processes` processes (by default one per CPU)
+        with up to `2 * processes` files in progress, while the metadata of the hashed
+        files is already being posted by `create_many()` with `max_workers` threads.
+
+        `logical_name` maps a path to the logical name of the file and must be picklable,
+        e.g. a module-level function; by default the absolute path is used. `site` is the
+        site of the location of the files.
+
+        Yields an `ingest.CreateResult` per file, see `create_many()`, also for `dedup`.
+        Files that cannot be read are reported as `FAILED` with the `EnvironmentError`.
+
+        `checkpoint` is an `ingest.Checkpoint` created with `key=ingest.file_key`, or the
+        path of its file. It remembers the created files by path, size and modification
+        time, so that files already stored are reported as `SKIPPED` without hashing them.
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+
+        own_checkpoint = checkpoint is not None and not isinstance(checkpoint, ingest.Checkpoint)
+        if own_checkpoint:
+            checkpoint = ingest.Checkpoint(checkpoint, key=ingest.file_key)
+
+        describe = functools.partial(ingest.file_metadata, site=site, logical_name=logical_name,
+                                     algorithm=algorithm)
+        reported = deque()
+
+        def report(path, status, error):
+            metadata = {'locations': [{'site': site, 'path': os.path.abspath(path)}]}
+            reported.append(ingest.CreateResult(metadata, status, None, error))
+
+        def unknown():
+            for path in paths:
+                try:
+                    done = checkpoint is not None and path in checkpoint
+                except EnvironmentError:
+                    # reported when it is read
+                    done = False
+
+                if done:
+                    report(path, ingest.SKIPPED, None)
+                else:
+                    yield path
+
+        def described():
+            for path, future in _bounded_map(describe, unknown(), processes, ordered=False,
+                                             executor_class=ProcessPoolExecutor):
+                error = future.exception()
+
+                if error is None:
+                    yield future.result()
+                elif isinstance(error, EnvironmentError):
+                    report(path, ingest.FAILED, error)
+                else:
+                    raise error
+
+        created = None if checkpoint is None else _PathCheckpoint(checkpoint)
+
+        try:
+            for result in self.create_many(described(), max_workers=max_workers, checkpoint=created,
+                                           dedup=dedup):
+                while reported:
+                    yield reported.popleft()
+
+                yield result
+
+            while reported:
+                yield reported.popleft()
+        finally:
+            if own_checkpoint:
+                checkpoint.close()
+
+    def _remember_created_etag(self, metadata, rdict, r):
+        """
+        Remembers the etag of a created file, identified by the `uuid` in `metadata`
+        or else by the link in the response.
+        """
+        uid = metadata.get('uuid')
+
+        if uid is None and 'file' in rdict:
+            uid = rdict['file'].rstrip('/').rsplit('/', 1)[-1]
+
+        if uid:
+            self._remember_etag(uid, r)
+
+    def update(self, uid, metadata={}, etag=None):
         """
         Updates/patches a metadata of a file.
+
+        The update is sent with the etag of the file as precondition. By default, the etag
+        remembered from an earlier response is used and only queried from the server if
+        none is known; if the server rejects a remembered etag, it is queried once more and
+        the update is retried. Pass an `etag` to use a specific one, or `etag=False` to send
+        the update without any precondition.
         """
-        return self._update_or_replace(uid=uid, metadata=metadata, method=self._r.patch)
+        return self._update_or_replace(uid=uid, metadata=metadata, method='PATCH', etag=etag)
 
-    def _update_or_replace(self, uid, metadata={}, method=None):
+    def _update_or_replace(self, uid, metadata={}, method=None, etag=None):
         """
         Since `patch` and `put` have the same interface but do different things,
         we only need one method with a switch.
@@ -219,29 +904,53 @@ class WFCClient:
         if not metadata:
             raise ClientError('No metadata has been passed to update file metadata')
 
-        # TODO: Remove support for etag as they are not being used properly in the
-        # patch method.
-        etag = self.get_etag(uid)
-        r = method(os.path.join(self._url, 'files', uid),
-                   data=json.dumps(metadata),
-                   headers={'If-None-Match': etag})
+        remembered = etag is None
+        if remembered:
+            etag = self._etags.get(uid)
+            if etag is None:
+                etag = self.get_etag(uid)
+                remembered = False
+
+        r = self._send_update(uid, metadata, method, etag)
+
+        if self._cache is not None:
+            self._cache.invalidate(uid)
+
+        if r.status_code == requests.codes.PRECONDITION_FAILED and remembered:
+            # The remembered etag is outdated
+            r = self._send_update(uid, metadata, method, self.get_etag(uid))
 
         if r.status_code == requests.codes.OK:
-            return r.json()
+            self._remember_etag(uid, r)
+            return self._loads(r.content)
         else:
+            self._etags.pop(uid)
             raise error_factory(r.status_code, r.text)
 
-    def replace(self, uid, metadata={}):
+    def _send_update(self, uid, metadata, method, etag):
+        headers = {} if etag is False else {'If-None-Match': etag}
+
+        return self._request(method, ['files', uid],
+                             data=json.dumps(metadata),
+                             headers=headers)
+
+    def replace(self, uid, metadata={}, etag=None):
         """
         Replaces the metadata of a file except for `mongo_id` and `uid`.
+
+        See `update()` for the handling of `etag`.
         """
-        return self._update_or_replace(uid=uid, metadata=metadata, method=self._r.put)
+        return self._update_or_replace(uid=uid, metadata=metadata, method='PUT', etag=etag)
 
     def delete(self, uid):
         """
         Deletes the metadata of a file.
         """
-        r = requests.delete(os.path.join(self._url, 'files', uid))
+        r = self._request('DELETE', ['files', uid])
+        self._etags.pop(uid)
+
+        if self._cache is not None:
+            self._cache.invalidate(uid)
 
         if r.status_code != requests.codes.NO_CONTENT:
             raise error_factory(r.status_code, r.text)
@@ -0,0 +1,84 @@
+"""
+Coalescing of identical concurrent calls ("single flight").
+"""
+
+import copy
+import threading
+
+
+class _Call(object):
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time.
+
+    Threads that call `do()` with a key while a call with that key is in flight wait
+    for it and share its result or its exception, instead of calling again. Shared
+    results are passed through `copy` so that no caller sees the changes of another.
+    """
+
+    def __init__(self, copy=copy.deepcopy):
+        self._copy = copy
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._count = 0
+        self._shared = 0
+
+    def do(self, key, fn):
+        """
+        Returns the result of `fn()`, or of the call with the same `key` in flight.
+        """
+        with self._lock:
+            self._count += 1
+            call = self._calls.get(key)
+
+            if call is not None:
+                call.waiters += 1
+                self._shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+
+            if call.error is not None:
+                raise call.error
+
+            return self._copy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                # no more waiters can join from here on
+                shared = call.waiters > 0
+
+            call.done.set()
+
+        # the waiters copy the result concurrently, so the caller gets its own copy too
+        return self._copy(call.result) if shared else call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """
+        Returns the number of calls and of calls that shared the result of another.
+        """
+        with self._lock:
+            return {'calls': self._count, 'shared': self._shared}
@@ -0,0 +1,244 @@
+"""
+Columnar storage of selected fields of many files, for listings and aggregations.
+
+Values are kept in typed arrays instead of one dict per file. NumPy is used for the
+aggregations if it is installed, otherwise they fall back to plain Python.
+"""
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .client import ClientError
+
+
+# array typecodes and numpy dtypes of the column kinds
+TYPECODES = {'int': 'q', 'float': 'd', 'str': 'i'}
+DTYPES = {'int': 'int64', 'float': 'float64', 'str': 'int32'}
+
+MISSING = {'int': 0, 'float': float('nan')}
+
+
+def _lookup(metadata, path):
+    for part in path:
+        if not isinstance(metadata, dict) or part not in metadata:
+            return None
+        metadata = metadata[part]
+
+    return metadata
+
+
+class Column(object):
+    """
+    One typed column.
+
+    `kind` is `'int'`, `'float'` or `'str'`. Strings (and other hashable values) are
+    dictionary encoded: the array holds codes into `categories`. Missing numeric values
+    are stored as `0` or `nan`, missing strings as the category `None`; `valid()` tells
+    them apart from real values.
+    """
+
+    def __init__(self, kind, source):
+        if kind not in TYPECODES:
+            raise ClientError('Unknown column kind `{}`.'.format(kind))
+
+        self.kind = kind
+        self.source = source
+        self.data = array(TYPECODES[kind])
+        self.mask = array('B')
+        self.categories = []
+        self._codes = {}
+
+        if callable(source):
+            self._get = source
+        else:
+            path = source.split('.')
+            self._get = lambda f: _lookup(f, path)
+
+    def append(self, f):
+        value = self._get(f)
+        self.mask.append(value is not None)
+
+        if self.kind == 'str':
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.categories)
+                self.categories.append(value)
+
+            self.data.append(code)
+        else:
+            self.data.append(MISSING[self.kind] if value is None else value)
+
+    def raw(self):
+        """
+        The stored values (codes for strings) as numpy array or `array.array`.
+        """
+        if numpy is None:
+            return self.data
+
+        return numpy.frombuffer(self.data, dtype=DTYPES[self.kind]).copy()
+
+    def valid(self):
+        """
+        Whether each row has a value, as numpy bool array or `array.array` of 0 and 1.
+        """
+        if numpy is None:
+            return self.mask
+
+        return numpy.frombuffer(self.mask, dtype='uint8').astype(bool)
+
+    def values(self):
+        """
+        The decoded values as numpy array, or as list/`array.array` without numpy.
+        """
+        if self.kind != 'str':
+            return self.raw()
+
+        if numpy is None:
+            return [self.categories[c] for c in self.data]
+
+        categories = numpy.empty(len(self.categories), dtype=object)
+        categories[:] = self.categories
+        return categories[self.raw()]
+
+    def groups(self):
+        """
+        Returns `(codes, labels)`: a group code per row and the label of each code.
+        Rows without a value have the code `-1`.
+        """
+        if self.kind == 'str':
+            labels = list(self.categories)
+            none = self._codes.get(None)
+
+            if none is None:
+                return self.raw(), labels
+
+            del labels[none]
+
+            if numpy is None:
+                return [-1 if c == none else c - (c > none) for c in self.data], labels
+
+            codes = self.raw()
+            return numpy.where(codes == none, -1, codes - (codes > none)), labels
+
+        if numpy is None:
+            labels = sorted(set(v for v, ok in zip(self.data, self.mask) if ok))
+            index = dict((v, i) for i, v in enumerate(labels))
+            return [index[v] if ok else -1 for v, ok in zip(self.data, self.mask)], labels
+
+        valid = self.valid()
+        codes = numpy.full(len(self.data), -1, dtype='int64')
+        labels, codes[valid] = numpy.unique(self.raw()[valid], return_inverse=True)
+        return codes, labels.tolist()
+
+
+class Columns(object):
+    """
+    Typed columns of selected fields of files.
+
+    `fields` maps a column name to its kind (`'int'`, `'float'` or `'str'`), or to a
+    `(kind, source)` tuple. The source is a dotted path into the metadata, e.g.
+    `offline_processing_metadata.dataset_id`, or a callable that extracts the value
+    from a file. By default, the column name is used as path.
+    """
+
+    def __init__(self, fields):
+        self._columns = {}
+
+        for name, spec in fields.items():
+            kind, source = spec if isinstance(spec, tuple) else (spec, name)
+            self._columns[name] = Column(kind, source)
+
+        self._length = 0
+
+    def keys(self):
+        """
+        The top-level metadata keys the columns are extracted from, as far as known.
+        """
+        return sorted(set(c.source.split('.')[0] for c in self._columns.values()
+                          if not callable(c.source)))
+
+    def append(self, f):
+        for c in self._columns.values():
+            c.append(f)
+
+        self._length += 1
+
+    def extend(self, files):
+        for f in files:
+            self.append(f)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, name):
+        return self._columns[name].values()
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def column(self, name):
+        return self._columns[name]
+
+    def sum(self, name):
+        """
+        Sums up the values of a numeric column.
+        """
+        column = self._columns[name]
+
+        if numpy is None:
+            return sum(v for v, ok in zip(column.data, column.mask) if ok)
+
+        return column.raw()[column.valid()].sum().item()
+
+    def count(self, name=None, value=None):
+        """
+        Counts all rows, or the rows where column `name` equals `value`, or has no
+        value if `value` is `None`.
+        """
+        if name is None:
+            return self._length
+
+        if value is None:
+            return self._length - sum(self._columns[name].mask)
+
+        return self.group_by(name).get(value, 0)
+
+    def group_by(self, key, value=None):
+        """
+        Groups the rows by column `key`.
+
+        Returns a dict that maps each distinct value of `key` to the sum of column
+        `value` in that group, or to the number of rows if `value` is not given. Rows
+        without a `key` are left out, as are missing values from the sums.
+        """
+        codes, labels = self._columns[key].groups()
+
+        if value is None:
+            if numpy is None:
+                totals = [0] * len(labels)
+                for c in codes:
+                    if c >= 0:
+                        totals[c] += 1
+            else:
+                totals = numpy.bincount(codes[codes >= 0], minlength=len(labels)).tolist()
+        else:
+            column = self._columns[value]
+
+            if numpy is None:
+                totals = [0] * len(labels)
+                for c, v, ok in zip(codes, column.data, column.mask):
+                    if c >= 0 and ok:
+                        totals[c] += v
+            else:
+                rows = (codes >= 0) & column.valid()
+
+                # integers are summed exactly instead of via float weights
+                totals = numpy.zeros(len(labels), dtype=DTYPES[column.kind])
+                numpy.add.at(totals, codes[rows], column.raw()[rows])
+                totals = totals.tolist()
+
+        return dict(zip(labels, totals))
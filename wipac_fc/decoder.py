@@ -0,0 +1,324 @@
+"""
+JSON decoding of server responses.
+
+The backend is pluggable: `orjson` or `ujson` are used if they are installed, the
+standard library `json` otherwise. `iter_array()` decodes the elements of one array
+of a response incrementally while its body arrives.
+"""
+
+import codecs
+import json
+import re
+
+from json.decoder import scanstring
+
+
+BACKENDS = ('orjson', 'ujson', 'json')
+
+_scanner = json.JSONDecoder()
+
+_TOKEN = re.compile(r'[{}\[\]",:]')
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_OBJECT_START = re.compile(r'[ \t\n\r]*\{[ \t\n\r]*(\}?)')
+_KEY = re.compile(r'"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+_ESCAPED_KEY = re.compile(r'("[^"\\]*(?:\\.[^"\\]*)*")[ \t\n\r]*:[ \t\n\r]*', re.S)
+_NEXT = re.compile(r'[ \t\n\r]*([,}])[ \t\n\r]*')
+
+# A scalar value: a string, or a number, `true`, `false` or `null`
+_SCALAR = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[^,:"{}\[\]\s]+', re.S)
+
+# Everything up to the next bracket outside of strings
+_INNER = r'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*'
+_SKIP = re.compile(_INNER, re.S)
+
+
+def _nested(depth):
+    pattern = r'[{\[]' + _INNER + r'[}\]]'
+    for _ in range(depth - 1):
+        pattern = r'[{\[]' + _INNER + r'(?:' + pattern + _INNER + r')*[}\]]'
+
+    return pattern
+
+
+# A complete object or array nested up to 8 levels deep, matched in one go
+_CONTAINER = re.compile(_nested(8), re.S)
+
+# A member of an object with its value and the following `,` or `}`
+_MEMBER = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"[ \t\n\r]*:[ \t\n\r]*('
+                     + _SCALAR.pattern + '|' + _nested(8) + r')[ \t\n\r]*([,}])[ \t\n\r]*', re.S)
+
+
+def _scan(text, pos, depth):
+    """
+    Scans the brackets of a json object or array from `pos` on, where `depth` of them
+    are open. Returns `(pos, depth)`: if `depth` is 0, the value ends at `pos`, else
+    `text` ends within the value and the scan can be resumed at `pos` once it is longer.
+    """
+    while True:
+        pos = _SKIP.match(text, pos).end()
+        if pos == len(text) or text[pos] == '"':
+            # the value, or a string in it, continues
+            return pos, depth
+
+        if text[pos] in '{[':
+            depth += 1
+        else:
+            depth -= 1
+
+        pos += 1
+        if depth == 0:
+            return pos, 0
+
+
+def _value_end(text, pos):
+    """
+    Returns the end of the json value starting at `pos` in `text`, or `None` if `text`
+    ends before the value does. The value is not decoded, nor fully validated.
+    """
+    if text[pos] not in '{[':
+        m = _SCALAR.match(text, pos)
+        return None if m is None else m.end()
+
+    m = _CONTAINER.match(text, pos)
+    if m is not None:
+        return m.end()
+
+    # deeper nesting
+    end, depth = _scan(text, pos, 0)
+    return None if depth else end
+
+
+def get_decoder(backend=None):
+    """
+    Returns the `loads` function of `backend`, which decodes `bytes` or `str`.
+
+    `backend` is one of `BACKENDS`, a callable that is returned as is, or `None` to
+    pick the first installed backend of `BACKENDS`.
+    """
+    if callable(backend):
+        return backend
+
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError('Unknown json backend `{}`.'.format(backend))
+
+    for name in BACKENDS if backend is None else (backend,):
+        if name == 'json':
+            return json.loads
+
+        try:
+            module = __import__(name)
+        except ImportError:
+            if backend is not None:
+                raise
+
+            continue
+
+        return module.loads
+
+
+def _is_path(stack, path):
+    if len(stack) != len(path):
+        return False
+
+    return all(kind == '{' and key == p for (kind, key), p in zip(stack, path))
+
+
+def iter_array(chunks, path, loads=json.loads):
+    """
+    Yields the decoded elements of the array at `path` of a json document.
+
+    `chunks` is an iterable of `bytes`, e.g. `response.iter_content()`, and `path` the
+    keys leading to the array, e.g. `('_embedded', 'files')`. Only the text of the
+    element that is currently decoded is buffered, never the whole document.
+
+    Each element is decoded once: with `json.loads`, the scanner of the standard
+    library decodes it in place, other backends get the json text of the element, whose
+    end is found by scanning its brackets and strings. The scan of an element that
+    spans several chunks is resumed where it stopped, so small chunks cost no more.
+    """
+    if loads is None:
+        loads = json.loads
+
+    path = tuple(path)
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    text = ''
+    pos = 0
+
+    # containers enclosing `pos`: [kind, key of the value that is being read]
+    stack = []
+    expect_key = False
+
+    inside = False
+    done = False
+
+    # `(offset, depth)` of the scan of an element that continues in the next chunk
+    partial = None
+
+    for chunk in chunks:
+        if done:
+            # drain the rest of the body
+            continue
+
+        text = text[pos:] + utf8.decode(chunk)
+        pos = 0
+
+        while not inside:
+            m = _TOKEN.search(text, pos)
+            if m is None:
+                pos = len(text)
+                break
+
+            i = m.start()
+            c = text[i]
+
+            if c == '"':
+                s = _STRING.match(text, i)
+                if s is None:
+                    # the string continues in the next chunk
+                    pos = i
+                    break
+
+                if expect_key:
+                    stack[-1][1] = scanstring(text, i + 1)[0]
+                    expect_key = False
+
+                pos = s.end()
+                continue
+
+            pos = i + 1
+
+            if c == '{' or c == '[':
+                inside = c == '[' and _is_path(stack, path)
+                stack.append([c, None])
+                expect_key = c == '{'
+            elif c == '}' or c == ']':
+                stack.pop()
+            elif c == ',' and stack and stack[-1][0] == '{':
+                expect_key = True
+
+        while inside:
+            if partial is not None:
+                # resume the scan of an object or array that continued in this chunk
+                end, depth = _scan(text, pos + partial[0], partial[1])
+                if depth:
+                    partial = (end - pos, depth)
+                    break
+
+                partial = None
+                yield loads(text[pos:end])
+                pos = end
+                continue
+
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos == len(text):
+                break
+
+            c = text[pos]
+            if c == ']':
+                done = True
+                break
+            elif c == ',':
+                pos += 1
+                continue
+
+            if c not in '{[':
+                m = _SCALAR.match(text, pos)
+                after = len(text) if m is None else _WHITESPACE.match(text, m.end()).end()
+
+                if after == len(text) or text[after] not in ',]':
+                    # a string or number might continue in the next chunk
+                    break
+
+                yield loads(m.group())
+                pos = m.end()
+                continue
+
+            end = None
+            if loads is json.loads:
+                # the scanner of the standard library finds the end while decoding
+                try:
+                    value, end = _scanner.raw_decode(text, pos)
+                except ValueError:
+                    pass
+            else:
+                m = _CONTAINER.match(text, pos)
+                if m is not None:
+                    end = m.end()
+                    value = loads(m.group())
+
+            if end is None:
+                # scanned once, then resumed as further chunks arrive
+                end, depth = _scan(text, pos, 0)
+                if depth:
+                    partial = (end - pos, depth)
+                    break
+
+                value = loads(text[pos:end])
+
+            yield value
+            pos = end
+
+    if inside and not done:
+        raise ValueError('The json document ended within the array.')
+
+
+def split_object(raw):
+    """
+    Splits the json object `raw` (`str` or `bytes`) into a list of `(key, text)` tuples,
+    one per member, where `text` is the undecoded json text of the value.
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8')
+
+    members = []
+
+    m = _OBJECT_START.match(raw)
+    if m is None:
+        raise ValueError('Expected a json object.')
+
+    pos = m.end()
+    if m.group(1):
+        return members
+
+    while True:
+        m = _MEMBER.match(raw, pos)
+        if m is not None:
+            key, text, end = m.groups()
+            if '\\' in key:
+                key = scanstring(raw, m.start(1))[0]
+
+            members.append((key, text))
+
+            if end == '}':
+                return members
+
+            pos = m.end()
+            continue
+
+        # values nested deeper, or invalid json
+        m = _KEY.match(raw, pos)
+        if m is not None:
+            key = m.group(1)
+        else:
+            # keys with escape sequences
+            m = _ESCAPED_KEY.match(raw, pos)
+            if m is None:
+                raise ValueError('Expected a key at position {}.'.format(pos))
+
+            key = scanstring(m.group(1), 1)[0]
+
+        pos = m.end()
+        end = _value_end(raw, pos) if pos < len(raw) else None
+        if end is None:
+            raise ValueError('Expected a value at position {}.'.format(pos))
+
+        members.append((key, raw[pos:end]))
+
+        m = _NEXT.match(raw, end)
+        if m is None:
+            raise ValueError('Expected `,` or `}}` at position {}.'.format(end))
+        elif m.group(1) == '}':
+            return members
+
+        pos = m.end()
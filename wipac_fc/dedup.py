@@ -0,0 +1,253 @@
+"""
+Local index of the files known to the catalog, to detect duplicates before creating files.
+
+Keys are kept as UTF-8 bytes in one buffer, ordered by their 64-bit fingerprints in
+typed arrays behind a Bloom filter, which needs about 20 bytes per key plus the key
+itself instead of a Python string each. Fingerprint matches are checked against the
+keys, so the answers are exact. NumPy is used to merge the arrays if it is installed.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import struct
+import threading
+
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .ingest import CONFLICT, DUPLICATE, REPLICA
+
+
+# Outcome of `DuplicateIndex.check()` for unknown files, besides the `ingest` ones
+NEW = 'new'
+
+
+def _hashes(key):
+    """
+    Returns two 64-bit hashes of the string `key`; the first one is its fingerprint.
+    """
+    return struct.unpack('<QQ', hashlib.sha1(key.encode('utf-8')).digest()[:16])
+
+
+class BloomFilter(object):
+    """
+    A Bloom filter sized for `capacity` keys at a false positive rate of `error_rate`.
+    Keys are given as the two hashes of `_hashes()`.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+
+        self.size = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / float(capacity) * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, h1, h2):
+        bits = self._bits
+        size = self.size
+
+        for i in range(self.hashes):
+            p = (h1 + i * h2) % size
+            bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, hashes):
+        h1, h2 = hashes
+        bits = self._bits
+        size = self.size
+
+        for i in range(self.hashes):
+            p = (h1 + i * h2) % size
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+
+        return True
+
+
+class FingerprintSet(object):
+    """
+    An exact set of strings, ordered by 64-bit fingerprints behind a `BloomFilter`.
+
+    The filter answers most lookups of unknown keys without a search; a fingerprint that
+    is found is confirmed by comparing the stored key. New keys are collected in a small
+    set and merged into the sorted arrays once it has grown by an eighth.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.01):
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._recent = set()
+
+        # the keys, and per fingerprint in sorted order the offset and length of its key
+        self._keys = bytearray()
+        self._sorted = array('Q')
+        self._offsets = array('Q')
+        self._lengths = array('I')
+
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+
+    def _find(self, fingerprint, key):
+        data = key.encode('utf-8')
+        i = bisect_left(self._sorted, fingerprint)
+
+        while i < len(self._sorted) and self._sorted[i] == fingerprint:
+            offset = self._offsets[i]
+            if self._keys[offset:offset + self._lengths[i]] == data:
+                return True
+
+            i += 1
+
+        return False
+
+    def __contains__(self, key):
+        hashes = _hashes(key)
+
+        if hashes not in self._bloom:
+            return False
+
+        return key in self._recent or self._find(hashes[0], key)
+
+    def add(self, key):
+        hashes = _hashes(key)
+
+        if hashes in self._bloom and (key in self._recent or self._find(hashes[0], key)):
+            return
+
+        self._bloom.add(*hashes)
+        self._recent.add(key)
+
+        if len(self._recent) > max(4096, len(self._sorted) // 8):
+            self._merge()
+
+    def _merge(self):
+        fingerprints = array('Q')
+        offsets = array('Q')
+        lengths = array('I')
+
+        for key in self._recent:
+            data = key.encode('utf-8')
+            fingerprints.append(_hashes(key)[0])
+            offsets.append(len(self._keys))
+            lengths.append(len(data))
+            self._keys.extend(data)
+
+        if numpy is None:
+            merged = list(heapq.merge(zip(self._sorted, self._offsets, self._lengths),
+                                      sorted(zip(fingerprints, offsets, lengths))))
+            self._sorted = array('Q', (m[0] for m in merged))
+            self._offsets = array('Q', (m[1] for m in merged))
+            self._lengths = array('L', (m[2] for m in merged))
+        else:
+            new = numpy.frombuffer(fingerprints, dtype='uint64')
+            order = numpy.argsort(new, kind='stable')
+            current = numpy.frombuffer(self._sorted, dtype='uint64')
+            at = numpy.searchsorted(current, new[order])
+
+            for name, dtype, added in [('_sorted', 'uint64', fingerprints), ('_offsets', 'uint64', offsets),
+                                       ('_lengths', lengths.typecode, lengths)]:
+                merged = numpy.insert(numpy.frombuffer(getattr(self, name), dtype=dtype), at,
+                                      numpy.frombuffer(added, dtype=dtype)[order])
+                result = array(getattr(self, name).typecode)
+                result.frombytes(merged.tobytes())
+                setattr(self, name, result)
+
+        self._recent = set()
+
+
+def _checksums(metadata):
+    """
+    Returns the `(algorithm, value)` pairs of the checksum of a file.
+    """
+    checksum = metadata.get('checksum')
+
+    if not isinstance(checksum, dict):
+        return []
+
+    return [(algorithm, json.dumps(value)) for algorithm, value in sorted(checksum.items())]
+
+
+def _location(location):
+    return json.dumps(location, sort_keys=True)
+
+
+class DuplicateIndex(object):
+    """
+    Remembers the logical names, checksums and locations of files known to the catalog.
+
+    `check()` tells for a metadata record whether creating it would add a `NEW` file, a
+    `REPLICA` of a known file, a `DUPLICATE` of a known file and locations, or a `CONFLICT`
+    with a known file of the same logical name but another checksum. Checksums are
+    compared for the algorithms that both files have; a known file without such an
+    algorithm cannot be judged and is reported as `NEW`, so the catalog decides.
+
+    Seed the index with `from_listing()` and `add()` every file that is created. It may
+    be used by several threads.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.01):
+        self._names = FingerprintSet(capacity, error_rate)
+        self._algorithms = FingerprintSet(capacity, error_rate)
+        self._checksums = FingerprintSet(capacity, error_rate)
+        self._locations = FingerprintSet(capacity, error_rate)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_listing(cls, client, query={}, capacity=1000000, error_rate=0.01, page_size=1000):
+        """
+        Creates an index of the files matching `query`, listed with `client`.
+        """
+        index = cls(capacity, error_rate)
+
+        for f in client.iter_list(query, page_size=page_size, stream=True,
+                                  keys=['uuid', 'logical_name', 'checksum', 'locations']):
+            index.add(f)
+
+        return index
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, metadata):
+        name = metadata['logical_name']
+
+        with self._lock:
+            self._names.add(name)
+
+            for algorithm, value in _checksums(metadata):
+                self._algorithms.add(name + '\0' + algorithm)
+                self._checksums.add(name + '\0' + algorithm + '\0' + value)
+
+            for location in metadata.get('locations') or []:
+                self._locations.add(name + '\0' + _location(location))
+
+    def check(self, metadata):
+        """
+        Returns `NEW`, `REPLICA`, `DUPLICATE` or `CONFLICT`, see the class.
+        """
+        name = metadata['logical_name']
+
+        with self._lock:
+            if name not in self._names:
+                return NEW
+
+            common = [(algorithm, value) for algorithm, value in _checksums(metadata)
+                      if name + '\0' + algorithm in self._algorithms]
+
+            if not common:
+                return NEW
+
+            if any(name + '\0' + algorithm + '\0' + value not in self._checksums
+                   for algorithm, value in common):
+                return CONFLICT
+
+            locations = metadata.get('locations') or []
+            if locations and all(name + '\0' + _location(l) in self._locations for l in locations):
+                return DUPLICATE
+
+            return REPLICA
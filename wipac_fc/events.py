@@ -0,0 +1,162 @@
+"""
+Local index of the event ranges of the files of one run.
+"""
+
+import json
+
+from array import array
+from bisect import bisect_right
+
+from .client import ClientError
+
+
+# last event of the unused leaves of the tree in `EventIndex`
+_NONE = -2 ** 63
+
+
+def _interval(metadata):
+    """
+    Returns `(first_event, last_event)` of a file, or `None` if they are unknown.
+    """
+    opm = metadata.get('offline_processing_metadata') or {}
+    first = opm.get('first_event')
+    last = opm.get('last_event')
+
+    if first is None or last is None:
+        return None
+
+    return int(first), int(last)
+
+
+class EventIndex(object):
+    """
+    Maps event numbers of one run, identified by `dataset_id` and `run_id`, to the
+    files that contain them, without asking the server.
+
+    The event ranges are kept sorted by first event in typed arrays. A binary search
+    finds the files that start at or before an event, and a tree of the maximum last
+    events of these files leads to the ones that reach it, so that a lookup takes
+    `O((k + 1) log n)` steps for `k` results even if some files span many others.
+
+    Build the index with `EventIndex.build()`, or restore it with `EventIndex.load()`.
+    """
+
+    def __init__(self, dataset_id, run_id, files=()):
+        """
+        `files` holds `(first_event, last_event, uuid, locations)` tuples.
+        """
+        self.dataset_id = dataset_id
+        self.run_id = run_id
+
+        files = sorted(files, key=lambda f: (f[0], f[1]))
+
+        self._first = array('q', (f[0] for f in files))
+        self._last = array('q', (f[1] for f in files))
+        self._uuids = [f[2] for f in files]
+        self._locations = [f[3] for f in files]
+
+        # binary tree of the highest last events: node `j` has the children `2j` and
+        # `2j + 1`, the leaves from index `_size` on are the files
+        size = 1
+        while size < len(files):
+            size *= 2
+
+        self._size = size
+        self._tree = array('q', [_NONE]) * size + self._last + array('q', [_NONE]) * (size - len(files))
+        for j in range(size - 1, 0, -1):
+            self._tree[j] = max(self._tree[2 * j], self._tree[2 * j + 1])
+
+    @classmethod
+    def build(cls, client, dataset_id, run_id, query={}, page_size=1000):
+        """
+        Lists the files of the run with `client` and indexes their event ranges.
+
+        `query` adds conditions, e.g. `{'content_status': 'good'}`. Files without
+        `first_event` or `last_event` are left out.
+        """
+        query = dict(query)
+        query['offline_processing_metadata.dataset_id'] = dataset_id
+        query['offline_processing_metadata.run_id'] = run_id
+
+        files = []
+        for f in client.iter_list(query, page_size=page_size, stream=True,
+                                  keys=['uuid', 'offline_processing_metadata', 'locations']):
+            interval = _interval(f)
+            if interval is not None:
+                files.append(interval + (f['uuid'], f.get('locations', [])))
+
+        return cls(dataset_id, run_id, files)
+
+    def __len__(self):
+        return len(self._uuids)
+
+    def _find(self, event_id):
+        """
+        Yields the indices of the files that contain `event_id`.
+        """
+        # the files starting at or before `event_id`
+        end = bisect_right(self._first, event_id)
+        tree = self._tree
+
+        # nodes with the first file they cover and their width
+        stack = [(1, 0, self._size)] if end else []
+
+        while stack:
+            j, start, width = stack.pop()
+
+            if start >= end or tree[j] < event_id:
+                continue
+
+            if width == 1:
+                yield start
+            else:
+                width //= 2
+                stack.append((2 * j + 1, start + width, width))
+                stack.append((2 * j, start, width))
+
+    def lookup(self, event_id):
+        """
+        Returns a list of `(uuid, locations)` of the files that contain `event_id`.
+        """
+        return [(self._uuids[i], self._locations[i]) for i in sorted(self._find(event_id))]
+
+    def lookup_many(self, event_ids):
+        """
+        Returns a dict that maps each of `event_ids` to the result of `lookup()`.
+        """
+        return dict((e, self.lookup(e)) for e in event_ids)
+
+    def paths(self, event_ids, site=None):
+        """
+        Returns a dict that maps each of `event_ids` to the paths of the files that
+        contain it, optionally only at `site`.
+        """
+        result = {}
+
+        for e in event_ids:
+            result[e] = [l['path'] for i in sorted(self._find(e)) for l in self._locations[i]
+                         if 'path' in l and (site is None or l.get('site') == site)]
+
+        return result
+
+    def save(self, path):
+        """
+        Stores the index as json file at `path`.
+        """
+        with open(path, 'w') as f:
+            json.dump({
+                'dataset_id': self.dataset_id,
+                'run_id': self.run_id,
+                'files': [[first, last, uid, locations] for first, last, uid, locations
+                          in zip(self._first, self._last, self._uuids, self._locations)],
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+
+        if not isinstance(data, dict) or 'files' not in data:
+            raise ClientError('`{}` is not an event index.'.format(path))
+
+        return cls(data['dataset_id'], data['run_id'], [tuple(f) for f in data['files']])
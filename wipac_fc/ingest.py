@@ -0,0 +1,138 @@
+"""
+Helpers for registering many files in the file catalog.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from collections import namedtuple
+
+
+# Outcomes of `WFCClient.create_many()`
+CREATED = 'created'
+REPLICA = 'replica'
+CONFLICT = 'conflict'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+DUPLICATE = 'duplicate'
+
+CreateResult = namedtuple('CreateResult', ['metadata', 'status', 'result', 'error'])
+CreateResult.__doc__ = """
+Outcome of creating one file: `status` is one of `CREATED`, `REPLICA`, `CONFLICT`,
+`FAILED`, `SKIPPED` or `DUPLICATE`, `result` the response of the server and `error` the `Error`
+if the server rejected the file.
+"""
+
+# Size of the reads when checksumming files
+BUFFER_SIZE = 8 * 1024 * 1024
+
+
+def record_key(metadata):
+    """
+    Identifies a metadata record by the sha1 of its canonical json encoding.
+    """
+    return hashlib.sha1(json.dumps(metadata, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def file_key(path):
+    """
+    Identifies a local file by its absolute path, size and modification time, so that
+    it can be recognized without reading it.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return json.dumps([path, stat.st_size, stat.st_mtime])
+
+
+def checksum_file(path, algorithm='sha512', buffer_size=BUFFER_SIZE):
+    """
+    Returns `(hexdigest, size)` of the file at `path`.
+
+    The file is read unbuffered into one reused buffer of `buffer_size` bytes; both the
+    reads and the hashing release the GIL, so that several files can be hashed in threads.
+    """
+    h = hashlib.new(algorithm)
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    size = 0
+
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+
+            h.update(view[:n])
+            size += n
+
+    return h.hexdigest(), size
+
+
+def file_metadata(path, site, logical_name=None, algorithm='sha512', buffer_size=BUFFER_SIZE):
+    """
+    Builds the metadata to create the local file at `path` at `site`.
+
+    `logical_name` maps the absolute path to the logical name; by default it is the same.
+    """
+    path = os.path.abspath(path)
+    checksum, size = checksum_file(path, algorithm, buffer_size)
+
+    return {
+        'logical_name': path if logical_name is None else logical_name(path),
+        'checksum': {algorithm: checksum},
+        'file_size': size,
+        'locations': [{'site': site, 'path': path}],
+    }
+
+
+class Checkpoint(object):
+    """
+    Remembers which metadata records have been registered, so that an interrupted
+    ingest can be resumed.
+
+    The keys of the records are appended to the file at `path`, one per line, and
+    are read back when the checkpoint is opened again. `key` maps a record to its key
+    and defaults to `record_key()`. Records may be added by several threads.
+    """
+
+    def __init__(self, path, key=record_key):
+        self.path = path
+        self._key = key
+        self._done = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._done.add(line)
+
+        self._file = open(path, 'a')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, metadata):
+        return self._key(metadata) in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def add(self, metadata):
+        key = self._key(metadata)
+
+        with self._lock:
+            if key not in self._done:
+                self._done.add(key)
+                self._file.write(key + '\n')
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
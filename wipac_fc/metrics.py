@@ -0,0 +1,245 @@
+"""
+Instrumentation of the requests sent by the client.
+"""
+
+import threading
+import time
+
+from bisect import bisect_left
+
+
+# Upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+class _Series(object):
+    __slots__ = ('count', 'buckets', 'latency', 'status', 'request_bytes', 'response_bytes', 'retries')
+
+    def __init__(self, n):
+        self.count = 0
+        self.buckets = [0] * (n + 1)
+        self.latency = 0.0
+        self.status = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics(object):
+    """
+    Records the requests of one or more clients, per method and endpoint (`files`
+    or `files/<uid>`): the number of requests, a latency histogram, the status codes,
+    the bytes sent and received, and the retries of throttled requests.
+
+    Hooks added with `add_pre_hook()` are called as `hook(method, url, kwargs)` before
+    a request, those added with `add_post_hook()` as `hook(method, url, response, elapsed)`
+    after it; `response` is `None` if the request failed with an exception.
+
+    Requests with `stream=True` are recorded once their body has been read or the
+    response has been closed, with the time until then and the bytes read.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        self._pre_hooks = []
+        self._post_hooks = []
+
+    def add_pre_hook(self, hook):
+        self._pre_hooks.append(hook)
+
+    def add_post_hook(self, hook):
+        self._post_hooks.append(hook)
+
+    def _get_series(self, method, endpoint):
+        key = (method, endpoint)
+        series = self._series.get(key)
+
+        if series is None:
+            series = self._series.setdefault(key, _Series(len(self.buckets)))
+
+        return series
+
+    def measure(self, method, endpoint, url, kwargs, send):
+        """
+        Calls `send()`, which sends the request and returns the response, and records it.
+        """
+        for hook in self._pre_hooks:
+            hook(method, url, kwargs)
+
+        start = _timer()
+        r = None
+
+        try:
+            r = send()
+        finally:
+            if r is None or not kwargs.get('stream'):
+                self._finish(method, endpoint, url, r, _timer() - start, kwargs)
+
+        if kwargs.get('stream'):
+            self._watch_body(method, endpoint, url, r, start, kwargs)
+
+        return r
+
+    def _finish(self, method, endpoint, url, r, elapsed, kwargs, received=None):
+        self.observe(method, endpoint, r, elapsed, kwargs, received)
+
+        for hook in self._post_hooks:
+            hook(method, url, r, elapsed)
+
+    def _watch_body(self, method, endpoint, url, r, start, kwargs):
+        """
+        Records the streamed response `r` when its body has been read or it is closed.
+        """
+        iter_content = r.iter_content
+        close = r.close
+        lock = threading.Lock()
+        received = [0]
+        done = [False]
+
+        def finish():
+            with lock:
+                if done[0]:
+                    return
+                done[0] = True
+
+            self._finish(method, endpoint, url, r, _timer() - start, kwargs, received[0])
+
+        def counted(*args, **kw):
+            for chunk in iter_content(*args, **kw):
+                received[0] += len(chunk)
+                yield chunk
+
+            finish()
+
+        def closing():
+            try:
+                close()
+            finally:
+                finish()
+
+        r.iter_content = counted
+        r.close = closing
+
+    def observe(self, method, endpoint, r, elapsed, kwargs={}, received=None):
+        """
+        Records a request that took `elapsed` seconds and was answered with `r`, of
+        which `received` bytes of a streamed body have been read.
+        """
+        data = kwargs.get('data')
+        request_bytes = len(data) if data else 0
+
+        if r is None:
+            status = 'error'
+            response_bytes = 0
+        else:
+            status = r.status_code
+            length = r.headers.get('content-length')
+
+            if length is not None:
+                response_bytes = int(length)
+            elif received is not None:
+                response_bytes = received
+            elif kwargs.get('stream'):
+                response_bytes = 0
+            else:
+                response_bytes = len(r.content)
+
+        bucket = bisect_left(self.buckets, elapsed)
+
+        with self._lock:
+            series = self._get_series(method, endpoint)
+            series.count += 1
+            series.buckets[bucket] += 1
+            series.latency += elapsed
+            series.status[status] = series.status.get(status, 0) + 1
+            series.request_bytes += request_bytes
+            series.response_bytes += response_bytes
+
+    def retry(self, method, endpoint):
+        with self._lock:
+            self._get_series(method, endpoint).retries += 1
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def snapshot(self):
+        """
+        Returns the recorded metrics as a dict keyed by `'<method> <endpoint>'`.
+
+        The latency histogram is given as cumulative counts per bucket upper bound, like
+        in Prometheus, with `'+Inf'` as the last bound.
+        """
+        bounds = [str(b) for b in self.buckets] + ['+Inf']
+        result = {}
+
+        with self._lock:
+            for (method, endpoint), series in sorted(self._series.items()):
+                cumulative = 0
+                histogram = {}
+                for bound, n in zip(bounds, series.buckets):
+                    cumulative += n
+                    histogram[bound] = cumulative
+
+                result['{} {}'.format(method, endpoint)] = {
+                    'count': series.count,
+                    'latency': {'buckets': histogram, 'sum': series.latency},
+                    'status': dict(series.status),
+                    'request_bytes': series.request_bytes,
+                    'response_bytes': series.response_bytes,
+                    'retries': series.retries,
+                }
+
+        return result
+
+    def to_prometheus(self, prefix='wfc_client'):
+        """
+        Returns the recorded metrics in the Prometheus text exposition format.
+        """
+        bounds = [repr(float(b)) for b in self.buckets] + ['+Inf']
+        requests = []
+        durations = []
+        request_bytes = []
+        response_bytes = []
+        retries = []
+
+        with self._lock:
+            for (method, endpoint), series in sorted(self._series.items()):
+                labels = 'method="{}",endpoint="{}"'.format(_label(method), _label(endpoint))
+
+                for status, n in sorted(series.status.items(), key=lambda i: str(i[0])):
+                    requests.append('{}_requests_total{{{},status="{}"}} {}'.format(prefix, labels, _label(status), n))
+
+                cumulative = 0
+                for bound, n in zip(bounds, series.buckets):
+                    cumulative += n
+                    durations.append('{}_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                        prefix, labels, bound, cumulative))
+
+                durations.append('{}_request_duration_seconds_sum{{{}}} {}'.format(prefix, labels, series.latency))
+                durations.append('{}_request_duration_seconds_count{{{}}} {}'.format(prefix, labels, series.count))
+
+                request_bytes.append('{}_request_bytes_total{{{}}} {}'.format(prefix, labels, series.request_bytes))
+                response_bytes.append('{}_response_bytes_total{{{}}} {}'.format(prefix, labels, series.response_bytes))
+                retries.append('{}_retries_total{{{}}} {}'.format(prefix, labels, series.retries))
+
+        lines = []
+        for name, kind, doc, samples in [
+                ('requests_total', 'counter', 'Requests sent to the file catalog.', requests),
+                ('request_duration_seconds', 'histogram', 'Latency of requests to the file catalog.', durations),
+                ('request_bytes_total', 'counter', 'Bytes of request bodies.', request_bytes),
+                ('response_bytes_total', 'counter', 'Bytes of response bodies.', response_bytes),
+                ('retries_total', 'counter', 'Retries of throttled requests.', retries)]:
+            lines.append('# HELP {}_{} {}'.format(prefix, name, doc))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+            lines.extend(samples)
+
+        return '\n'.join(lines) + '\n'
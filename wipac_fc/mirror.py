@@ -0,0 +1,222 @@
+"""
+Local mirror of the files matching catalog queries, stored in SQLite.
+"""
+
+import json
+import sqlite3
+import time
+
+from .client import NotFoundError
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    uuid TEXT PRIMARY KEY,
+    logical_name TEXT,
+    dataset_id INTEGER,
+    run_id INTEGER,
+    meta_modify_date TEXT,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_logical_name ON files (logical_name);
+CREATE INDEX IF NOT EXISTS files_dataset_run ON files (dataset_id, run_id);
+CREATE INDEX IF NOT EXISTS files_run ON files (run_id);
+
+CREATE TABLE IF NOT EXISTS query_files (
+    query TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    PRIMARY KEY (query, uuid)
+);
+
+CREATE TABLE IF NOT EXISTS syncs (
+    query TEXT PRIMARY KEY,
+    modified TEXT,
+    synced REAL,
+    full_synced REAL
+);
+"""
+
+# Keys that are stored in their own, indexed column
+COLUMNS = {
+    'uuid': 'uuid',
+    'logical_name': 'logical_name',
+    'offline_processing_metadata.dataset_id': 'dataset_id',
+    'offline_processing_metadata.run_id': 'run_id',
+    'meta_modify_date': 'meta_modify_date',
+}
+
+
+def _query_key(query):
+    return json.dumps(query, sort_keys=True)
+
+
+def _lookup(metadata, key):
+    for part in key.split('.'):
+        if not isinstance(metadata, dict):
+            return None
+        metadata = metadata.get(part)
+
+    return metadata
+
+
+class Mirror(object):
+    """
+    Mirrors the metadata of the files matching catalog queries into the SQLite
+    database at `path`, so that they can be queried offline.
+
+    The first `sync()` of a query downloads all matching files. Later syncs only fetch
+    files whose `meta_modify_date` is not older than the newest one seen so far.
+    """
+
+    def __init__(self, client, path, page_size=1000, max_workers=8):
+        self._client = client
+        self._page_size = page_size
+        self._max_workers = max_workers
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def _sync_row(self, key):
+        return self._db.execute('SELECT modified, synced, full_synced FROM syncs WHERE query = ?',
+                                (key,)).fetchone()
+
+    def sync(self, query={}, full=False):
+        """
+        Updates the mirror of the files matching `query`.
+
+        Incremental syncs cannot notice files that have been deleted from the catalog or
+        no longer match the query. A `full` sync lists all matching files again, drops
+        those that are gone and fetches the ones that changed.
+
+        Returns a dict with the number of `fetched` and `removed` files.
+        """
+        key = _query_key(query)
+        row = self._sync_row(key)
+        full = full or row is None or row[0] is None
+        modified = None if row is None else row[0]
+
+        remote_query = query
+        if not full:
+            since = {'meta_modify_date': {'$gte': modified}}
+            if 'meta_modify_date' in query:
+                remote_query = {'$and': [query, since]}
+            else:
+                remote_query = dict(query, **since)
+
+        listing = self._client.iter_list(remote_query, page_size=self._page_size)
+        uids = [f['uuid'] for f in listing]
+        fetched = 0
+        removed = []
+
+        for uid, metadata, error in self._client.get_many(uids, max_workers=self._max_workers,
+                                                          ordered=False):
+            if isinstance(error, NotFoundError):
+                # deleted after it has been listed
+                removed.append(uid)
+                continue
+            elif error is not None:
+                raise error
+
+            self._store(key, metadata)
+            fetched += 1
+
+            if metadata.get('meta_modify_date') and metadata['meta_modify_date'] > (modified or ''):
+                modified = metadata['meta_modify_date']
+
+            if fetched % 1000 == 0:
+                self._db.commit()
+
+        if full:
+            listed = set(uids)
+            removed.extend(uid for (uid,) in self._db.execute('SELECT uuid FROM query_files WHERE query = ?', (key,))
+                           if uid not in listed)
+
+        self._remove(key, removed)
+
+        now = time.time()
+        full_synced = now if full else row[2]
+        self._db.execute('INSERT OR REPLACE INTO syncs (query, modified, synced, full_synced) VALUES (?, ?, ?, ?)',
+                         (key, modified, now, full_synced))
+        self._db.commit()
+
+        return {'fetched': fetched, 'removed': len(removed)}
+
+    def _store(self, key, metadata):
+        self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                         (metadata['uuid'],
+                          metadata.get('logical_name'),
+                          _lookup(metadata, 'offline_processing_metadata.dataset_id'),
+                          _lookup(metadata, 'offline_processing_metadata.run_id'),
+                          metadata.get('meta_modify_date'),
+                          json.dumps(metadata)))
+        self._db.execute('INSERT OR IGNORE INTO query_files VALUES (?, ?)', (key, metadata['uuid']))
+
+    def _remove(self, key, uids):
+        self._db.executemany('DELETE FROM query_files WHERE query = ? AND uuid = ?',
+                             ((key, uid) for uid in uids))
+        self._db.executemany('DELETE FROM files WHERE uuid = ? AND uuid NOT IN (SELECT uuid FROM query_files)',
+                             ((uid,) for uid in uids))
+
+    def query(self, where={}, synced_query=None):
+        """
+        Yields the mirrored metadata of the files whose keys equal the values in `where`.
+
+        Keys may be dotted, e.g. `offline_processing_metadata.run_id`. Lookups on `uuid`,
+        `logical_name`, `meta_modify_date` and the `dataset_id` and `run_id` of
+        `offline_processing_metadata` are indexed. If `synced_query` is given, only the
+        files mirrored for that query are considered.
+        """
+        conditions = []
+        params = []
+
+        for k in sorted(where):
+            if k in COLUMNS:
+                conditions.append('files.{} = ?'.format(COLUMNS[k]))
+            else:
+                conditions.append("json_extract(files.metadata, ?) = ?")
+                params.append('$.' + k)
+
+            params.append(where[k])
+
+        sql = 'SELECT files.metadata FROM files'
+        if synced_query is not None:
+            sql += ' JOIN query_files ON query_files.uuid = files.uuid AND query_files.query = ?'
+            params.insert(0, _query_key(synced_query))
+
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+
+        for (metadata,) in self._db.execute(sql, params):
+            yield json.loads(metadata)
+
+    def staleness(self, query={}):
+        """
+        Reports the state of the mirror of `query`, or `None` if it has never been synced.
+
+        Returns a dict with the number of mirrored `files`, the newest `meta_modify_date`
+        seen, the times of the last sync and the last full sync, and the `age` of the
+        mirror in seconds.
+        """
+        key = _query_key(query)
+        row = self._sync_row(key)
+
+        if row is None:
+            return None
+
+        count = self._db.execute('SELECT COUNT(*) FROM query_files WHERE query = ?', (key,)).fetchone()[0]
+
+        return {
+            'files': count,
+            'modified': row[0],
+            'synced': row[1],
+            'full_synced': row[2],
+            'age': time.time() - row[1],
+        }
@@ -0,0 +1,159 @@
+"""
+Adaptive concurrency control and retries for throttled requests.
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+
+# Status codes with which the server asks clients to slow down
+THROTTLED = (requests.codes.TOO_MANY_REQUESTS, requests.codes.SERVICE_UNAVAILABLE)
+
+
+def retry_after(r):
+    """
+    Returns the delay in seconds requested by the `Retry-After` header of `r`, or `None`.
+    """
+    value = r.headers.get('retry-after')
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+
+    return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+
+class RateController(object):
+    """
+    Limits the number of concurrent requests and retries throttled ones.
+
+    The controller can be shared by several clients and threads. Requests that are
+    answered with `429 Too Many Requests` or `503 Service Unavailable` are retried up to
+    `max_retries` times. The delay honors the `Retry-After` header, otherwise it grows
+    exponentially from `backoff` up to `max_backoff` seconds with full jitter. While a
+    `Retry-After` delay is pending, no new requests are sent.
+
+    The number of concurrent requests adapts to the server (AIMD): every successful
+    request raises the limit by `1 / limit`, i.e. by one per round of requests, and
+    throttling multiplies it by `decrease`. The limit stays between `min_concurrency`
+    and `max_concurrency`.
+    """
+
+    def __init__(self, concurrency=8, min_concurrency=1, max_concurrency=64,
+                 max_retries=5, backoff=0.5, max_backoff=60.0, decrease=0.5):
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.decrease = decrease
+
+        self.throttled = 0
+        self.retries = 0
+
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                pause = self._resume_at - time.time()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self._in_flight >= max(1, int(self.limit)):
+                    self._cond.wait()
+                else:
+                    break
+
+            self._in_flight += 1
+            return time.time()
+
+    def _release(self, started, throttled, delay, answered=True):
+        """
+        Frees the slot of a request sent at `started`. Only `answered` requests that were
+        not throttled raise the limit; a request that failed without a response leaves it.
+        """
+        with self._cond:
+            self._in_flight -= 1
+
+            if throttled:
+                self.throttled += 1
+
+                # Only decrease once for requests sent before the last decrease
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                    self._last_decrease = time.time()
+
+                if delay is not None:
+                    self._resume_at = max(self._resume_at, time.time() + delay)
+            elif answered:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+
+            self._cond.notify_all()
+
+    def _delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def call(self, send, on_retry=None):
+        """
+        Calls `send()`, which sends a request and returns the `requests.Response`, within
+        the concurrency limit and retries it while the server throttles.
+
+        `on_retry` is called before every retry. The response of the last attempt is
+        returned, even if it is still throttled.
+        """
+        attempt = 0
+
+        while True:
+            started = self._acquire()
+            try:
+                r = send()
+            except Exception:
+                self._release(started, False, None, answered=False)
+                raise
+
+            throttled = r.status_code in THROTTLED
+            requested = retry_after(r) if throttled else None
+            self._release(started, throttled, requested)
+
+            if not throttled or attempt >= self.max_retries:
+                return r
+
+            if requested is not None:
+                delay = requested + random.uniform(0, self.backoff)
+            else:
+                delay = self._delay(attempt)
+
+            r.close()
+
+            with self._cond:
+                self.retries += 1
+
+            if on_retry is not None:
+                on_retry()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'throttled': self.throttled,
+                'retries': self.retries,
+            }
@@ -0,0 +1,158 @@
+"""
+Compact, lazily decoded representation of the metadata of a file.
+"""
+
+import json
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from . import decoder
+
+
+# Top-level fields that are stored in slots instead of a dict
+FIELDS = (
+    'uuid',
+    'logical_name',
+    'file_size',
+    'checksum',
+    'locations',
+    'content_status',
+    'data_type',
+    'create_date',
+    'meta_modify_date',
+)
+
+
+class FileRecord(Mapping):
+    """
+    The metadata of a file with a read-only dict interface.
+
+    The common top-level `FIELDS` are stored in slots and can also be read as
+    attributes, e.g. `record.file_size`. Nested values such as `locations` or
+    `offline_processing_metadata` are kept as undecoded json until they are first
+    accessed. Use `to_dict()` to get a plain, fully decoded dict.
+    """
+
+    __slots__ = FIELDS + ('_raw', '_extra', '_loads')
+
+    def __init__(self, loads=json.loads):
+        self._raw = None
+        self._extra = None
+        self._loads = loads
+
+    @classmethod
+    def from_json(cls, raw, loads=json.loads):
+        """
+        Creates a record from the json object `raw` (`str` or `bytes`). Scalar values
+        are decoded with `loads`, nested values are kept as json text and decoded when
+        they are accessed.
+        """
+        record = cls(loads)
+        keys = []
+        scalars = []
+
+        for key, text in decoder.split_object(raw):
+            if text[0] in '{[':
+                if record._raw is None:
+                    record._raw = {}
+
+                record._raw[key] = text
+            else:
+                keys.append(key)
+                scalars.append(text)
+
+        # one call for all scalars
+        for key, value in zip(keys, loads('[' + ','.join(scalars) + ']')):
+            record._set(key, value)
+
+        return record
+
+    @classmethod
+    def from_dict(cls, metadata):
+        record = cls()
+
+        for key, value in metadata.items():
+            record._set(key, value)
+
+        return record
+
+    def _set(self, key, value):
+        if key in FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+
+            self._extra[key] = value
+
+    def _has_slot(self, key):
+        try:
+            object.__getattribute__(self, key)
+            return True
+        except AttributeError:
+            return False
+
+    def _decode(self, key):
+        value = self._loads(self._raw.pop(key))
+        self._set(key, value)
+
+        if not self._raw:
+            self._raw = None
+
+        return value
+
+    def __getattr__(self, name):
+        # Only called for unset slots
+        if name in FIELDS and self._raw is not None and name in self._raw:
+            return self._decode(name)
+
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+
+        if self._raw is not None and key in self._raw:
+            return self._decode(key)
+
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if self._raw is not None:
+            self._raw.pop(key, None)
+
+        self._set(key, value)
+
+    def __contains__(self, key):
+        if key in FIELDS and self._has_slot(key):
+            return True
+
+        return (self._extra is not None and key in self._extra) or (self._raw is not None and key in self._raw)
+
+    def __iter__(self):
+        for key in FIELDS:
+            if self._has_slot(key):
+                yield key
+
+        for mapping in (self._extra, self._raw):
+            if mapping is not None:
+                for key in list(mapping):
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        return dict((key, self[key]) for key in self)
+
+    def __repr__(self):
+        return 'FileRecord({!r})'.format(self.to_dict())
@@ -0,0 +1,166 @@
+"""
+Concurrent listing of a query split into disjoint shards.
+"""
+
+import copy
+import itertools
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from .client import ClientError, _complete_keys, _with_uuid
+
+
+_FILES = 'files'
+_DONE = 'done'
+_ERROR = 'error'
+
+
+def range_queries(query, key, bounds):
+    """
+    Splits `query` into sub-queries by value ranges of `key`.
+
+    `bounds` are the sorted boundaries of the ranges. Returns one sub-query for values
+    below the first boundary, one per range `[bounds[i], bounds[i + 1])`, one for values
+    from the last boundary on, and one for files where `key` is missing or `null`.
+    """
+    bounds = list(bounds)
+
+    if not bounds:
+        raise ClientError('Argument `bounds` must not be empty.')
+
+    if any(a >= b for a, b in zip(bounds, bounds[1:])):
+        raise ClientError('Argument `bounds` must be strictly increasing.')
+
+    conditions = [{'$lt': bounds[0]}]
+    conditions.extend({'$gte': a, '$lt': b} for a, b in zip(bounds, bounds[1:]))
+    conditions.append({'$gte': bounds[-1]})
+    conditions.append(None)
+
+    queries = []
+    for condition in conditions:
+        if key in query:
+            queries.append({'$and': [query, {key: condition}]})
+        else:
+            q = copy.deepcopy(query)
+            q[key] = condition
+            queries.append(q)
+
+    return queries
+
+
+def offset_shards(query, window):
+    """
+    Generates shards of `window` consecutive files of the listing of `query`.
+    """
+    return ((query, start, window) for start in itertools.count(0, window))
+
+
+def _put(q, item, stop):
+    """
+    Puts `item` into `q` unless `stop` is set while waiting. Returns whether it was put.
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+
+    return False
+
+
+def _produce(client, shard, page_size, keys, out, stop):
+    """
+    Walks the pages of `shard` and puts them into `out`, followed by a done message.
+    A shard is a `(query, start, limit)` tuple; `limit` is `None` for all files.
+    """
+    query, start, limit = shard
+    count = 0
+
+    try:
+        while not stop.is_set() and (limit is None or count < limit):
+            n = page_size if limit is None else min(page_size, limit - count)
+            files = client.get_list(query=query, start=start + count, limit=n, keys=keys)['_embedded']['files']
+
+            _complete_keys(client, files, keys)
+            count += len(files)
+
+            if files and not _put(out, (_FILES, files), stop):
+                return
+
+            if len(files) < n:
+                break
+
+        # whether an offset window has reached the end of the listing
+        _put(out, (_DONE, limit is not None and count < limit), stop)
+    except Exception as e:
+        _put(out, (_ERROR, e), stop)
+
+
+def iter_sharded(client, shards, page_size=1000, max_workers=4, ordered=False, unique=True,
+                 keys=None, buffer=2):
+    """
+    Lists the `shards` concurrently with `client` and yields their files.
+
+    `shards` is an iterable of `(query, start, limit)` tuples and is consumed lazily;
+    once a shard with a `limit` comes up short, no further shards are started. Each of
+    the at most `max_workers` running shards holds up to `buffer` pages. With `ordered=True`
+    the files of one shard are all yielded before those of the next, else in arrival order.
+    With `unique=True` files whose `uuid` has been yielded before are skipped. `keys`
+    always include `uuid`.
+    """
+    keys = _with_uuid(keys)
+    shards = iter(shards)
+    stop = threading.Event()
+    shared = None if ordered else queue.Queue(buffer * max_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    # the queue of every running shard, in the order the shards were started
+    running = deque()
+    more = [True]
+    seen = set()
+
+    def start():
+        shard = next(shards, None) if more[0] else None
+        if shard is None:
+            more[0] = False
+            return
+
+        q = shared if shared is not None else queue.Queue(buffer)
+        running.append(q)
+        executor.submit(_produce, client, shard, page_size, keys, q, stop)
+
+    try:
+        for _ in range(max_workers):
+            start()
+
+        while running:
+            kind, payload = running[0].get()
+
+            if kind == _FILES:
+                for f in payload:
+                    if unique:
+                        uid = f.get('uuid')
+                        if uid in seen:
+                            continue
+                        seen.add(uid)
+
+                    yield f
+            elif kind == _ERROR:
+                raise payload
+            else:
+                running.popleft()
+                if payload:
+                    more[0] = False
+
+                start()
+    finally:
+        stop.set()
+        executor.shutdown(wait=False)
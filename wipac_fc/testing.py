@@ -0,0 +1,416 @@
+"""
+An in-process stand-in for the file catalog REST API, for tests and benchmarks.
+
+    with FakeServer(latency=0.002) as server:
+        client = WFCClient(server.url, server.port)
+        ...
+
+It implements listing and creating files on `/api/files`, and getting, patching,
+replacing and deleting them on `/api/files/<uuid>`, including etags, pagination,
+`keys` projections and the common query operators. Latency and throttling
+(`429 Too Many Requests`) can be injected.
+"""
+
+import copy
+import datetime
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid as uuid_module
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+
+MANDATORY = ('logical_name', 'checksum', 'locations')
+FORBIDDEN = ('uuid', '_id', 'mongo_id', 'meta_modify_date', 'create_date')
+
+_MISSING = object()
+
+
+def _lookup(metadata, key):
+    for part in key.split('.'):
+        if not isinstance(metadata, dict) or part not in metadata:
+            return _MISSING
+        metadata = metadata[part]
+
+    return metadata
+
+
+def _compare(value, op, arg):
+    if op == '$exists':
+        return (value is not _MISSING) == bool(arg)
+    elif op == '$ne':
+        return value is _MISSING or value != arg
+    elif op == '$nin':
+        return value is _MISSING or value not in arg
+    elif value is _MISSING:
+        return False
+    elif op == '$eq':
+        return value == arg
+    elif op == '$in':
+        return value in arg
+    elif op == '$regex':
+        return isinstance(value, str) and re.search(arg, value) is not None
+
+    try:
+        if op == '$gt':
+            return value > arg
+        elif op == '$gte':
+            return value >= arg
+        elif op == '$lt':
+            return value < arg
+        elif op == '$lte':
+            return value <= arg
+    except TypeError:
+        return False
+
+    raise ValueError('unsupported operator ' + op)
+
+
+def matches(metadata, query):
+    """
+    Tells whether `metadata` matches the mongo-style `query`.
+    """
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(metadata, q) for q in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(metadata, q) for q in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+            value = _lookup(metadata, key)
+            if not all(_compare(value, op, arg) for op, arg in condition.items()):
+                return False
+        else:
+            value = _lookup(metadata, key)
+
+            # `null` also matches missing fields
+            if (None if value is _MISSING else value) != condition:
+                return False
+
+    return True
+
+
+class FakeFileCatalog(object):
+    """
+    The in-memory state of the fake server. Files are listed in creation order.
+    """
+
+    def __init__(self, max_limit=10000):
+        self.max_limit = max_limit
+        self.files = {}
+        self.etags = {}
+        self.requests = {}
+        self._versions = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def count(self, method):
+        with self._lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+
+    def _touch(self, uid):
+        self.files[uid]['meta_modify_date'] = datetime.datetime.utcnow().isoformat()
+        self.etags[uid] = '"{}"'.format(next(self._versions))
+
+    def add(self, metadata):
+        """
+        Adds a file directly, without validation. Returns its uuid.
+        """
+        with self._lock:
+            metadata = copy.deepcopy(metadata)
+            uid = metadata.setdefault('uuid', str(uuid_module.uuid4()))
+            metadata.setdefault('create_date', datetime.datetime.utcnow().isoformat())
+            self.files[uid] = metadata
+            self._touch(uid)
+            return uid
+
+    def list(self, query, start, limit, keys):
+        with self._lock:
+            found = [f for f in self.files.values() if matches(f, query)][start:start + limit]
+            return [dict((k, f[k]) for k in keys if k in f) for f in found]
+
+    def get(self, uid):
+        with self._lock:
+            if uid not in self.files:
+                return None, None
+
+            return copy.deepcopy(self.files[uid]), self.etags[uid]
+
+    def create(self, metadata):
+        """
+        Returns `(status, message or uuid)`.
+        """
+        missing = [k for k in MANDATORY if k not in metadata]
+        if missing:
+            return 400, 'mandatory metadata missing: ' + ', '.join(missing)
+
+        with self._lock:
+            if metadata.get('uuid') in self.files:
+                return 409, 'conflict with existing file (uuid already exists)'
+
+            for uid, f in self.files.items():
+                if f.get('logical_name') != metadata['logical_name']:
+                    continue
+
+                if f.get('checksum') != metadata['checksum']:
+                    return 409, 'conflict with existing file (logical_name already exists)'
+
+                # add replica
+                new = [l for l in metadata['locations'] if l not in f['locations']]
+                f['locations'].extend(new)
+                if new:
+                    self._touch(uid)
+
+                return 200, uid
+
+            return 201, self.add(metadata)
+
+    def update(self, uid, metadata, etag, replace):
+        """
+        Returns `(status, message)`.
+        """
+        if any(k in metadata for k in FORBIDDEN):
+            return 400, 'forbidden attributes'
+
+        if replace:
+            missing = [k for k in MANDATORY if k not in metadata]
+            if missing:
+                return 400, 'mandatory metadata missing: ' + ', '.join(missing)
+
+        with self._lock:
+            if uid not in self.files:
+                return 404, 'not found'
+
+            if etag is not None and etag != self.etags[uid]:
+                return 412, 'etag mismatch'
+
+            f = self.files[uid]
+            if replace:
+                f = self.files[uid] = dict(metadata, uuid=uid, create_date=f.get('create_date'))
+            else:
+                f.update(copy.deepcopy(metadata))
+
+            self._touch(uid)
+            return 200, None
+
+    def delete(self, uid):
+        with self._lock:
+            if self.files.pop(uid, None) is None:
+                return False
+
+            self.etags.pop(uid)
+            return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def catalog(self):
+        return self.server.catalog
+
+    def _send(self, status, body=None, headers={}):
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+
+        self.send_response(status)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message, headers={}):
+        self._send(status, {'message': message}, headers)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+
+    def _dispatch(self, method):
+        server = self.server
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+
+        if method in ('POST', 'PATCH', 'PUT'):
+            try:
+                body = self._body()
+            except ValueError:
+                return self._error(400, 'invalid json')
+
+        self.catalog.count(method)
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.throttle and random.random() < server.throttle:
+            return self._error(429, 'too many requests', {'Retry-After': str(server.retry_after)})
+
+        if parts[:2] != ['api', 'files'] or len(parts) > 3:
+            return self._error(404, 'not found')
+
+        if len(parts) == 2:
+            if method == 'GET':
+                return self._list(parse_qs(url.query))
+            elif method == 'POST':
+                return self._create(body)
+        else:
+            uid = parts[2]
+            if method == 'GET':
+                return self._get(uid)
+            elif method in ('PATCH', 'PUT'):
+                return self._update(uid, body, method == 'PUT')
+            elif method == 'DELETE':
+                return self._delete(uid)
+
+        self._error(405, 'method not allowed')
+
+    def _list(self, params):
+        try:
+            query = json.loads(params['query'][0]) if 'query' in params else {}
+            start = int(params.get('start', ['0'])[0])
+            limit = int(params.get('limit', [str(self.catalog.max_limit)])[0])
+            keys = params['keys'][0].split('|') if 'keys' in params else ['uuid', 'logical_name']
+            if start < 0 or limit < 1 or limit > self.catalog.max_limit or not isinstance(query, dict):
+                raise ValueError()
+            files = self.catalog.list(query, start, limit, keys)
+        except ValueError:
+            return self._error(400, 'invalid query parameters')
+
+        self._send(200, {
+            '_links': {'self': {'href': '/api/files'}, 'parent': {'href': '/api'}},
+            '_embedded': {'files': files},
+            'files': ['/api/files/' + f['uuid'] for f in files if 'uuid' in f],
+        })
+
+    def _create(self, metadata):
+        status, result = self.catalog.create(metadata)
+
+        if status in (200, 201):
+            self._send(status, {'_links': {'self': {'href': '/api/files'}, 'parent': {'href': '/api'}},
+                                'file': '/api/files/' + result},
+                       {'ETag': self.catalog.etags[result]})
+        else:
+            self._error(status, result)
+
+    def _get(self, uid):
+        metadata, etag = self.catalog.get(uid)
+
+        if metadata is None:
+            self._error(404, 'not found')
+        elif self.headers.get('If-None-Match') == etag:
+            self._send(304, headers={'ETag': etag})
+        else:
+            metadata['_links'] = {'self': {'href': '/api/files/' + uid}, 'parent': {'href': '/api/files'}}
+            self._send(200, metadata, {'ETag': etag})
+
+    def _update(self, uid, metadata, replace):
+        status, message = self.catalog.update(uid, metadata, self.headers.get('If-None-Match'), replace)
+
+        if status == 200:
+            metadata, etag = self.catalog.get(uid)
+            self._send(200, metadata, {'ETag': etag})
+        else:
+            self._error(status, message)
+
+    def _delete(self, uid):
+        if self.catalog.delete(uid):
+            self._send(204)
+        else:
+            self._error(404, 'not found')
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeServer(object):
+    """
+    Serves a `FakeFileCatalog` on `127.0.0.1` from a background thread.
+
+    Every request is delayed by `latency` seconds, and a fraction `throttle` of the
+    requests is answered with `429 Too Many Requests` and `Retry-After: <retry_after>`.
+    These attributes may be changed while the server runs.
+    """
+
+    def __init__(self, catalog=None, port=0, latency=0.0, throttle=0.0, retry_after=0):
+        self.catalog = catalog if catalog is not None else FakeFileCatalog()
+        self.latency = latency
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self._port = port
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1'
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def start(self):
+        self._httpd = _ThreadingHTTPServer(('127.0.0.1', self._port), _Handler)
+        self._httpd.catalog = self.catalog
+        self._httpd.latency = self.latency
+        self._httpd.throttle = self.throttle
+        self._httpd.retry_after = self.retry_after
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+
+        # forward changes of the settings to the running server
+        httpd = self.__dict__.get('_httpd')
+        if httpd is not None and name in ('latency', 'throttle', 'retry_after'):
+            setattr(httpd, name, value)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,63 @@
+"""
+HTTP transport with a connection pool shared by all threads.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Transport(object):
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, timeout=None):
+        """
+        Initializes the transport.
+
+        `pool_maxsize` is the number of connections kept open per host and `pool_connections`
+        the number of hosts a pool is kept for. If `pool_block` is set, threads wait for a free
+        connection instead of opening extra connections that are discarded afterwards.
+
+        With `keep_alive=False` every request asks the server to close the connection.
+        `timeout` is passed to `requests`, i.e. either a single number of seconds or a
+        `(connect, read)` tuple, and applies to requests that do not specify their own.
+
+        `requests.Session` is not safe to share between threads, so every thread gets its
+        own session. All sessions are mounted on the same adapter and therefore share one
+        connection pool.
+        """
+        self._adapter = HTTPAdapter(pool_connections=pool_connections,
+                                    pool_maxsize=pool_maxsize,
+                                    pool_block=pool_block)
+        self._headers = {'Connection': 'keep-alive' if keep_alive else 'close'}
+        self._timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """
+        The `requests.Session` of the calling thread.
+        """
+        session = getattr(self._local, 'session', None)
+
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            session.headers.update(self._headers)
+            self._local.session = session
+
+        return session
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request and returns the `requests.Response`.
+        """
+        kwargs.setdefault('timeout', self._timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        """
+        Closes all pooled connections.
+        """
+        self._adapter.close()
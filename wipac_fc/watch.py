@@ -0,0 +1,150 @@
+"""
+Change feed of the files matching a query, by polling with a cursor.
+"""
+
+import json
+import os
+import threading
+
+from .client import ClientError
+
+
+class Watcher(object):
+    """
+    Delivers the files matching `query` that have been created or modified since the
+    last poll.
+
+    The cursor is the highest value of `field` seen so far, `meta_modify_date` or
+    `create_date`. Each poll lists only the files whose `field` is not lower than the
+    cursor, so its cost depends on the number of changes rather than on the size of the
+    catalog. Files at the cursor value that have already been delivered are skipped.
+    Without `since`, the first poll delivers all files matching `query`.
+
+    If a `state` path is given, the cursor is stored there after every poll and read
+    back when a watcher with the same query is created again. Changes of a batch that
+    was being delivered by `stream()` or `run()` when the process stopped are delivered
+    again.
+
+    The listed files hold `keys`; `uuid` and `field` are always included.
+    """
+
+    def __init__(self, client, query={}, interval=60, field='meta_modify_date', since=None,
+                 state=None, keys=None, page_size=1000):
+        if not isinstance(query, dict):
+            raise ClientError('Argument `query` must be a dict.')
+
+        if field in query:
+            raise ClientError('The query must not restrict the cursor field `{}`.'.format(field))
+
+        self._client = client
+        self._query = query
+        self._interval = interval
+        self._field = field
+        self._state = state
+        self._page_size = page_size
+        self._keys = ['uuid', field] + [k for k in (keys or ['logical_name']) if k not in ('uuid', field)]
+        self._stop = threading.Event()
+
+        self.cursor = since
+        self._seen = set()
+
+        if state is not None and os.path.exists(state):
+            self._load()
+
+    def _key(self):
+        return json.dumps({'query': self._query, 'field': self._field}, sort_keys=True)
+
+    def _load(self):
+        with open(self._state) as f:
+            data = json.load(f)
+
+        if data.get('key') != self._key():
+            raise ClientError('`{}` holds the state of another watch.'.format(self._state))
+
+        self.cursor = data['cursor']
+        self._seen = set(data['seen'])
+
+    def _save(self):
+        tmp = self._state + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'key': self._key(), 'cursor': self.cursor, 'seen': sorted(self._seen)}, f)
+
+        getattr(os, 'replace', os.rename)(tmp, self._state)
+
+    def _fetch(self):
+        """
+        Returns the changed files and the cursor and boundary uuids after them.
+        """
+        query = dict(self._query)
+        if self.cursor is not None:
+            query[self._field] = {'$gte': self.cursor}
+
+        cursor = self.cursor
+        seen = set(self._seen)
+        changes = []
+
+        for f in self._client.iter_list(query, page_size=self._page_size, keys=self._keys):
+            value = f.get(self._field)
+
+            if value is None:
+                changes.append(f)
+                continue
+
+            if value == self.cursor and f['uuid'] in self._seen:
+                # delivered by the previous poll
+                continue
+
+            changes.append(f)
+
+            if cursor is None or value > cursor:
+                cursor = value
+                seen = set()
+
+            if value == cursor:
+                seen.add(f['uuid'])
+
+        return changes, cursor, seen
+
+    def _advance(self, cursor, seen):
+        self.cursor = cursor
+        self._seen = seen
+
+        if self._state is not None:
+            self._save()
+
+    def poll(self):
+        """
+        Returns a list of the files that changed since the last poll.
+        """
+        changes, cursor, seen = self._fetch()
+        self._advance(cursor, seen)
+        return changes
+
+    def stream(self):
+        """
+        Yields changed files as they are found, polling every `interval` seconds,
+        until `stop()` is called.
+        """
+        self._stop.clear()
+
+        while not self._stop.is_set():
+            changes, cursor, seen = self._fetch()
+
+            for f in changes:
+                yield f
+
+            self._advance(cursor, seen)
+            self._stop.wait(self._interval)
+
+    def run(self, callback):
+        """
+        Calls `callback(metadata)` for every changed file until `stop()` is called.
+        """
+        for f in self.stream():
+            callback(f)
+
+    def stop(self):
+        """
+        Ends `stream()` and `run()` after the current poll. May be called from any thread.
+        """
+        self._stop.set()